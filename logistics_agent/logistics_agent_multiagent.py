@@ -16,15 +16,26 @@ Features:
 
 import os
 import asyncio
+import functools
+import itertools
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import math
+import re
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Callable, Iterator, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models import LlmResponse
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
@@ -106,6 +117,13 @@ ROUTES_DATA = {
     ]
 }
 
+# Share one interned tuple per distinct carrier list across all routes
+_CARRIER_SETS = {}
+for _route in ROUTES_DATA["sea_routes"] + ROUTES_DATA["air_routes"]:
+    _carriers = tuple(sys.intern(c) for c in _route["carriers"])
+    _route["carriers"] = _CARRIER_SETS.setdefault(_carriers, _carriers)
+del _route, _carriers
+
 RATES_DATA = {
     "sea_freight": {
         "Japan-China": {"20ft": 150, "40ft": 280, "LCL": 45},
@@ -160,6 +178,123 @@ HS_CODES = {
     "8517": {"desc": "Communication equipment", "duty": "0-5%"}
 }
 
+# =============================================================================
+# LOOKUP INDEXES (built once at import)
+# =============================================================================
+
+def _known_countries() -> set:
+    """Every country name spelled out somewhere in the dummy data."""
+    names = set(RATES_DATA["customs"]) | set(REGULATIONS_DATA)
+    for routes in ROUTES_DATA.values():
+        for route in routes:
+            names.add(route["origin"]["country"])
+            names.add(route["destination"]["country"])
+    for table in ("sea_freight", "air_freight"):
+        for lane in RATES_DATA[table]:
+            names.update(lane.split("-"))
+    return names
+
+
+_COUNTRY_CANON = {name.lower(): sys.intern(name) for name in _known_countries()}
+
+
+@functools.lru_cache(maxsize=64)
+def _canon_country(name: str) -> str:
+    """Canonical spelling of a known country ("japan" -> "Japan"); unknown names pass through."""
+    return _COUNTRY_CANON.get(name.strip().lower(), name)
+
+
+@functools.lru_cache(maxsize=64)
+def _lane(origin_country: str, destination_country: str) -> str:
+    """Rate-table key for a country pair, e.g. "Japan-China"."""
+    return sys.intern(f"{origin_country}-{destination_country}")
+
+
+def _frozen(value):
+    """Read-only copy of a tool result (dicts -> MappingProxyType, lists -> tuples) so it can be shared."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        items = tuple(_frozen(v) for v in value)
+        # Keep already-frozen tuples (e.g. shared carrier tuples) instead of copying them
+        if isinstance(value, tuple) and all(a is b for a, b in zip(items, value)):
+            return value
+        return items
+    return value
+
+
+def _thawed(value):
+    """Fresh mutable copy of a frozen tool result."""
+    if isinstance(value, MappingProxyType):
+        return {k: _thawed(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thawed(v) for v in value]
+    return value
+
+
+def _build_route_index(routes: list, place_key: str, code_key: str, sea: bool) -> dict:
+    """Group routes by canonical (origin_country, destination_country), preformatted for tool output."""
+    index = {}
+    for route in routes:
+        entry = {
+            "route_id": route["id"],
+            "origin": f"{route['origin'][place_key]} ({route['origin'][code_key]})",
+            "destination": f"{route['destination'][place_key]} ({route['destination'][code_key]})",
+            "transit_days": route["transit_time_days"],
+            "frequency": route["frequency"],
+            "carriers": route["carriers"]
+        }
+        if sea:
+            entry["type"] = route["route_type"]
+            entry["via"] = route.get("via", "Direct")
+        key = (route["origin"]["country"], route["destination"]["country"])
+        index.setdefault(key, []).append(entry)
+    return {key: _frozen(entries) for key, entries in index.items()}
+
+
+_SEA_INDEX = _build_route_index(ROUTES_DATA["sea_routes"], "port", "port_code", sea=True)
+_AIR_INDEX = _build_route_index(ROUTES_DATA["air_routes"], "airport", "airport_code", sea=False)
+
+# Air tiers: chargeable weight below _AIR_TIER_BOUNDS[i] bills at rate i
+_AIR_TIER_BOUNDS = (45, 100, 300, 500)
+_AIR_RATE_TIERS = {
+    lane: (
+        (rates["<45kg"], rates["45-100kg"], rates["100-300kg"], rates["300-500kg"], rates[">500kg"]),
+        rates["min"]
+    )
+    for lane, rates in RATES_DATA["air_freight"].items()
+}
+
+# Sea lanes as flat (20ft, 40ft, LCL) tuples; unknown container types price as 20ft
+_SEA_CONTAINER_SLOT = {"20ft": 0, "40ft": 1}
+_SEA_RATES = {
+    lane: (rates["20ft"], rates["40ft"], rates["LCL"])
+    for lane, rates in RATES_DATA["sea_freight"].items()
+}
+
+# Destination customs as (VAT %, doc + inspect + handling); unknown destinations bill as China
+_CUSTOMS_FEES = {
+    country: (fees["vat"], fees["doc"] + fees["inspect"] + fees["handling"])
+    for country, fees in RATES_DATA["customs"].items()
+}
+_DEFAULT_CUSTOMS_FEES = _CUSTOMS_FEES["China"]
+_INSURANCE_RATE = RATES_DATA["insurance_rate"]
+
+# Duty by 4-digit HS heading; headings not in the table are charged the default
+_DUTY_BY_HS4 = RATES_DATA["duty_rates"]
+_DEFAULT_DUTY_RATE = 0.05
+
+# Surcharges are static, so bind them once instead of re-reading RATES_DATA per quote
+_SURCHARGES = RATES_DATA["surcharges"]
+_BAF_PCT = _SURCHARGES["BAF_percent"]
+_CAF_PCT = _SURCHARGES["CAF_percent"]
+_THC_TOTAL = _SURCHARGES["THC_origin"] + _SURCHARGES["THC_dest"]
+_DOC_FEE = _SURCHARGES["doc_fee"]
+_SEAL_FEE = _SURCHARGES["seal_fee"]
+_FUEL_PCT = _SURCHARGES["fuel_percent"]
+_SECURITY_PER_KG = _SURCHARGES["security_per_kg"]
+_AWB_FEE = _SURCHARGES["AWB_fee"]
+
 # =============================================================================
 # ROUTE PLANNER TOOLS (3 tools)
 # =============================================================================
@@ -175,25 +310,13 @@ def search_sea_routes(origin_country: str, destination_country: str) -> dict:
     Returns:
         dict: Available sea routes with carriers and transit times
     """
-    logger.info(f"🔍 Searching sea routes: {origin_country} → {destination_country}")
-    
-    routes = []
-    for route in ROUTES_DATA["sea_routes"]:
-        if (route["origin"]["country"].lower() == origin_country.lower() and
-            route["destination"]["country"].lower() == destination_country.lower()):
-            routes.append({
-                "route_id": route["id"],
-                "origin": f"{route['origin']['port']} ({route['origin']['port_code']})",
-                "destination": f"{route['destination']['port']} ({route['destination']['port_code']})",
-                "transit_days": route["transit_time_days"],
-                "frequency": route["frequency"],
-                "carriers": route["carriers"],
-                "type": route["route_type"],
-                "via": route.get("via", "Direct")
-            })
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("🔍 Searching sea routes: %s → %s", origin_country, destination_country)
+    
+    routes = _SEA_INDEX.get((origin_country, destination_country))
     
     if routes:
-        return {"status": "success", "mode": "Sea Freight", "count": len(routes), "routes": routes}
+        return {"status": "success", "mode": "Sea Freight", "count": len(routes), "routes": _thawed(routes)}
     return {"status": "not_found", "message": f"No sea routes from {origin_country} to {destination_country}"}
 
 
@@ -208,26 +331,50 @@ def search_air_routes(origin_country: str, destination_country: str) -> dict:
     Returns:
         dict: Available air routes with carriers and transit times
     """
-    logger.info(f"✈️ Searching air routes: {origin_country} → {destination_country}")
-    
-    routes = []
-    for route in ROUTES_DATA["air_routes"]:
-        if (route["origin"]["country"].lower() == origin_country.lower() and
-            route["destination"]["country"].lower() == destination_country.lower()):
-            routes.append({
-                "route_id": route["id"],
-                "origin": f"{route['origin']['airport']} ({route['origin']['airport_code']})",
-                "destination": f"{route['destination']['airport']} ({route['destination']['airport_code']})",
-                "transit_days": route["transit_time_days"],
-                "frequency": route["frequency"],
-                "carriers": route["carriers"]
-            })
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("✈️ Searching air routes: %s → %s", origin_country, destination_country)
+    
+    routes = _AIR_INDEX.get((origin_country, destination_country))
     
     if routes:
-        return {"status": "success", "mode": "Air Freight", "count": len(routes), "routes": routes}
+        return {"status": "success", "mode": "Air Freight", "count": len(routes), "routes": _thawed(routes)}
     return {"status": "not_found", "message": f"No air routes from {origin_country} to {destination_country}"}
 
 
+_HEAVY_CARGO_KG = 300
+# LCL applies strictly below 15 CBM; nextafter makes that an inclusive bound like the others
+_VOLUME_BOUNDS = (1, math.nextafter(15, -math.inf), 25, 55)
+_VOLUME_CONTAINERS = ("LCL", "LCL", "FCL (20ft)", "FCL (40ft)", "LCL")
+
+
+def _build_mode_recommendations() -> dict:
+    """Sorted recommendations for every (urgency, heavy, volume bucket) cell."""
+    table = {}
+    for urgency in ("urgent", "normal", "economy"):
+        for heavy in (False, True):
+            for bucket, container in enumerate(_VOLUME_CONTAINERS):
+                recommendations = []
+                if urgency == "urgent" or (not heavy and bucket == 0):
+                    recommendations.append({
+                        "mode": "Air Freight",
+                        "priority": 1 if urgency == "urgent" else 2,
+                        "reason": "Fastest delivery" if urgency == "urgent" else "Cost-effective for small cargo",
+                        "transit": "1-3 days"
+                    })
+                recommendations.append({
+                    "mode": f"Sea Freight ({container})",
+                    "priority": 1 if urgency == "economy" else 2,
+                    "reason": "Most economical option" if heavy else "Good balance of cost and time",
+                    "transit": "5-35 days depending on destination"
+                })
+                recommendations.sort(key=lambda x: x["priority"])
+                table[(urgency, heavy, bucket)] = tuple(MappingProxyType(r) for r in recommendations)
+    return table
+
+
+_MODE_RECOMMENDATIONS = _build_mode_recommendations()
+
+
 def recommend_transport_mode(
     origin_country: str,
     destination_country: str,
@@ -248,30 +395,14 @@ def recommend_transport_mode(
     Returns:
         dict: Recommended transport mode with reasoning
     """
-    logger.info(f"🎯 Recommending mode: {weight_kg}kg, {volume_cbm}CBM, urgency={urgency}")
+    logger.info("🎯 Recommending mode: %skg, %sCBM, urgency=%s", weight_kg, volume_cbm, urgency)
     
-    recommendations = []
-    
-    if urgency == "urgent" or (weight_kg <= 300 and volume_cbm <= 1):
-        recommendations.append({
-            "mode": "Air Freight",
-            "priority": 1 if urgency == "urgent" else 2,
-            "reason": "Fastest delivery" if urgency == "urgent" else "Cost-effective for small cargo",
-            "transit": "1-3 days"
-        })
-    
-    container = "FCL (20ft)" if volume_cbm <= 25 else "FCL (40ft)" if volume_cbm <= 55 else "LCL"
-    if volume_cbm < 15:
-        container = "LCL"
-    
-    recommendations.append({
-        "mode": f"Sea Freight ({container})",
-        "priority": 1 if urgency == "economy" else 2,
-        "reason": "Most economical option" if weight_kg > 300 else "Good balance of cost and time",
-        "transit": "5-35 days depending on destination"
-    })
-    
-    recommendations.sort(key=lambda x: x["priority"])
+    key = (
+        urgency if urgency in ("urgent", "economy") else "normal",
+        weight_kg > _HEAVY_CARGO_KG,
+        bisect_left(_VOLUME_BOUNDS, volume_cbm)
+    )
+    recommendations = [dict(r) for r in _MODE_RECOMMENDATIONS[key]]
     
     return {
         "status": "success",
@@ -283,42 +414,72 @@ def recommend_transport_mode(
 # =============================================================================
 # COST ANALYST TOOLS (4 tools)
 # =============================================================================
+# The tools are async so live carrier-rate lookups can be awaited (and gathered)
+# without blocking the Runner; today they only wrap the cached pure-Python cores.
+
+# Arithmetic kernels: primitive floats in, tuple of floats out (no dicts, no strings)
 
-def calculate_sea_freight_cost(
+def _sea_cost_core(base: float, seal: float) -> tuple:
+    """(BAF, CAF, total) for a sea quote."""
+    baf = base * _BAF_PCT / 100
+    caf = base * _CAF_PCT / 100
+    return baf, caf, base + baf + caf + _THC_TOTAL + _DOC_FEE + seal
+
+
+def _air_cost_core(weight_kg: float, volume_cbm: float, tier_rates: tuple, min_charge: float) -> tuple:
+    """(volumetric kg, chargeable kg, rate, base, fuel, security, total) for an air quote."""
+    vol_weight = volume_cbm * 1000000 / 6000
+    chargeable = max(weight_kg, vol_weight)
+    rate = tier_rates[bisect_right(_AIR_TIER_BOUNDS, chargeable)]
+    base = max(chargeable * rate, min_charge)
+    fuel = base * _FUEL_PCT / 100
+    security = chargeable * _SECURITY_PER_KG
+    return vol_weight, chargeable, rate, base, fuel, security, base + fuel + security + _AWB_FEE
+
+
+def _landed_cost_core(
+    freight_cost: float,
+    cargo_value: float,
+    duty_rate: float,
+    vat_percent: float,
+    customs_total: float,
+    insurance_rate: float
+) -> tuple:
+    """(insurance, CIF, duty, VAT, total) for a landed-cost quote."""
+    insurance = max(cargo_value * 1.1 * insurance_rate, 25)
+    cif = cargo_value + freight_cost + insurance
+    duty = cargo_value * duty_rate
+    vat = (cargo_value + duty) * vat_percent / 100
+    return insurance, cif, duty, vat, cif + duty + vat + customs_total
+
+
+@functools.lru_cache(maxsize=1024)
+def _sea_freight_cost(
     origin_country: str,
     destination_country: str,
     weight_kg: float,
     volume_cbm: float,
-    container_type: str = "LCL"
-) -> dict:
-    """
-    Calculate sea freight cost with full breakdown.
-    """
-    logger.info(f"💰 Calculating sea freight: {origin_country}→{destination_country}, {container_type}")
-    
-    lane = f"{origin_country}-{destination_country}"
-    rates = RATES_DATA["sea_freight"].get(lane)
+    container_type: str
+) -> MappingProxyType:
+    lane = _lane(origin_country, destination_country)
+    rates = _SEA_RATES.get(lane)
     
     if not rates:
-        return {"status": "error", "message": f"No rates for {lane}"}
-    
-    surcharges = RATES_DATA["surcharges"]
+        return _frozen({"status": "error", "message": f"No rates for {lane}"})
     
     if container_type == "LCL":
         chargeable = max(volume_cbm, weight_kg / 1000)
-        base = chargeable * rates["LCL"]
+        base = chargeable * rates[2]
     else:
-        base = rates.get(container_type, rates["20ft"])
+        base = rates[_SEA_CONTAINER_SLOT.get(container_type, 0)]
     
-    baf = base * surcharges["BAF_percent"] / 100
-    caf = base * surcharges["CAF_percent"] / 100
-    thc = surcharges["THC_origin"] + surcharges["THC_dest"]
-    doc = surcharges["doc_fee"]
-    seal = surcharges["seal_fee"] if container_type != "LCL" else 0
+    thc = _THC_TOTAL
+    doc = _DOC_FEE
+    seal = _SEAL_FEE if container_type != "LCL" else 0
     
-    total = base + baf + caf + thc + doc + seal
+    baf, caf, total = _sea_cost_core(base, seal)
     
-    return {
+    return _frozen({
         "status": "success",
         "mode": "Sea Freight",
         "container": container_type,
@@ -333,50 +494,42 @@ def calculate_sea_freight_cost(
         },
         "total_usd": round(total, 2),
         "validity": "30 days"
-    }
+    })
 
 
-def calculate_air_freight_cost(
+async def calculate_sea_freight_cost(
     origin_country: str,
     destination_country: str,
     weight_kg: float,
-    volume_cbm: float
+    volume_cbm: float,
+    container_type: str = "LCL"
 ) -> dict:
     """
-    Calculate air freight cost with full breakdown.
+    Calculate sea freight cost with full breakdown.
     """
-    logger.info(f"✈️ Calculating air freight: {origin_country}→{destination_country}")
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("💰 Calculating sea freight: %s→%s, %s", origin_country, destination_country, container_type)
     
-    lane = f"{origin_country}-{destination_country}"
-    rates = RATES_DATA["air_freight"].get(lane)
-    
-    if not rates:
-        return {"status": "error", "message": f"No air rates for {lane}"}
-    
-    surcharges = RATES_DATA["surcharges"]
-    
-    vol_weight = volume_cbm * 1000000 / 6000
-    chargeable = max(weight_kg, vol_weight)
-    
-    if chargeable < 45:
-        rate = rates["<45kg"]
-    elif chargeable < 100:
-        rate = rates["45-100kg"]
-    elif chargeable < 300:
-        rate = rates["100-300kg"]
-    elif chargeable < 500:
-        rate = rates["300-500kg"]
-    else:
-        rate = rates[">500kg"]
+    return _thawed(_sea_freight_cost(origin_country, destination_country, weight_kg, volume_cbm, container_type))
+
+
+@functools.lru_cache(maxsize=1024)
+def _air_freight_cost(
+    origin_country: str,
+    destination_country: str,
+    weight_kg: float,
+    volume_cbm: float
+) -> MappingProxyType:
+    lane = _lane(origin_country, destination_country)
+    tiers = _AIR_RATE_TIERS.get(lane)
     
-    base = max(chargeable * rate, rates["min"])
-    fuel = base * surcharges["fuel_percent"] / 100
-    security = chargeable * surcharges["security_per_kg"]
-    awb = surcharges["AWB_fee"]
+    if not tiers:
+        return _frozen({"status": "error", "message": f"No air rates for {lane}"})
     
-    total = base + fuel + security + awb
+    vol_weight, chargeable, rate, base, fuel, security, total = _air_cost_core(weight_kg, volume_cbm, *tiers)
+    awb = _AWB_FEE
     
-    return {
+    return _frozen({
         "status": "success",
         "mode": "Air Freight",
         "route": lane,
@@ -394,32 +547,39 @@ def calculate_air_freight_cost(
         },
         "total_usd": round(total, 2),
         "validity": "7 days"
-    }
+    })
 
 
-def calculate_total_landed_cost(
-    freight_cost: float,
-    cargo_value: float,
+async def calculate_air_freight_cost(
+    origin_country: str,
     destination_country: str,
-    hs_code: str = "8479"
+    weight_kg: float,
+    volume_cbm: float
 ) -> dict:
     """
-    Calculate total landed cost including duties, taxes, and customs fees.
+    Calculate air freight cost with full breakdown.
     """
-    logger.info(f"📊 Calculating landed cost: ${cargo_value} to {destination_country}")
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("✈️ Calculating air freight: %s→%s", origin_country, destination_country)
     
-    customs = RATES_DATA["customs"].get(destination_country, RATES_DATA["customs"]["China"])
-    duty_rate = RATES_DATA["duty_rates"].get(hs_code[:4], 0.05)
-    insurance_rate = RATES_DATA["insurance_rate"]
+    return _thawed(_air_freight_cost(origin_country, destination_country, weight_kg, volume_cbm))
+
+
+@functools.lru_cache(maxsize=1024)
+def _total_landed_cost(
+    freight_cost: float,
+    cargo_value: float,
+    destination_country: str,
+    hs_code: str
+) -> MappingProxyType:
+    vat_percent, customs_total = _CUSTOMS_FEES.get(destination_country, _DEFAULT_CUSTOMS_FEES)
+    duty_rate = _DUTY_BY_HS4.get(hs_code[:4], _DEFAULT_DUTY_RATE)
     
-    insurance = max(cargo_value * 1.1 * insurance_rate, 25)
-    cif = cargo_value + freight_cost + insurance
-    duty = cargo_value * duty_rate
-    vat = (cargo_value + duty) * customs["vat"] / 100
-    customs_total = customs["doc"] + customs["inspect"] + customs["handling"]
-    total = cif + duty + vat + customs_total
+    insurance, cif, duty, vat, total = _landed_cost_core(
+        freight_cost, cargo_value, duty_rate, vat_percent, customs_total, _INSURANCE_RATE
+    )
     
-    return {
+    return _frozen({
         "status": "success",
         "destination": destination_country,
         "hs_code": hs_code,
@@ -433,14 +593,52 @@ def calculate_total_landed_cost(
             "duty": round(duty, 2),
             "duty_rate": f"{duty_rate*100}%",
             "VAT": round(vat, 2),
-            "VAT_rate": f"{customs['vat']}%"
+            "VAT_rate": f"{vat_percent}%"
         },
         "customs_fees": customs_total,
         "total_landed_cost_usd": round(total, 2)
-    }
+    })
 
 
-def compare_shipping_options(
+async def calculate_total_landed_cost(
+    freight_cost: float,
+    cargo_value: float,
+    destination_country: str,
+    hs_code: str = "8479"
+) -> dict:
+    """
+    Calculate total landed cost including duties, taxes, and customs fees.
+    """
+    destination_country = _canon_country(destination_country)
+    logger.info("📊 Calculating landed cost: $%s to %s", cargo_value, destination_country)
+    
+    return _thawed(_total_landed_cost(freight_cost, cargo_value, destination_country, hs_code))
+
+
+async def _sea_total(
+    origin_country: str,
+    destination_country: str,
+    weight_kg: float,
+    volume_cbm: float,
+    container_type: str
+) -> Optional[float]:
+    """Quoted sea total in USD straight from the cached core, or None if the lane has no rates."""
+    quote = _sea_freight_cost(origin_country, destination_country, weight_kg, volume_cbm, container_type)
+    return quote["total_usd"] if quote["status"] == "success" else None
+
+
+async def _air_total(
+    origin_country: str,
+    destination_country: str,
+    weight_kg: float,
+    volume_cbm: float
+) -> Optional[float]:
+    """Quoted air total in USD straight from the cached core, or None if the lane has no rates."""
+    quote = _air_freight_cost(origin_country, destination_country, weight_kg, volume_cbm)
+    return quote["total_usd"] if quote["status"] == "success" else None
+
+
+async def compare_shipping_options(
     origin_country: str,
     destination_country: str,
     weight_kg: float,
@@ -450,24 +648,30 @@ def compare_shipping_options(
     """
     Compare all shipping options side by side.
     """
-    logger.info(f"⚖️ Comparing options: {origin_country}→{destination_country}")
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("⚖️ Comparing options: %s→%s", origin_country, destination_country)
     
     options = []
     
-    sea = calculate_sea_freight_cost(origin_country, destination_country, weight_kg, volume_cbm, "LCL")
-    if sea["status"] == "success":
+    # Only the totals are needed, so skip building and copying the full breakdowns;
+    # gathered so both lookups overlap once rates come from a remote API
+    sea_total, air_total = await asyncio.gather(
+        _sea_total(origin_country, destination_country, weight_kg, volume_cbm, "LCL"),
+        _air_total(origin_country, destination_country, weight_kg, volume_cbm)
+    )
+    
+    if sea_total is not None:
         options.append({
             "option": "Sea Freight (LCL)",
-            "freight_cost": sea["total_usd"],
+            "freight_cost": sea_total,
             "transit": "5-14 days",
             "best_for": "Cost-sensitive, non-urgent"
         })
     
-    air = calculate_air_freight_cost(origin_country, destination_country, weight_kg, volume_cbm)
-    if air["status"] == "success":
+    if air_total is not None:
         options.append({
             "option": "Air Freight",
-            "freight_cost": air["total_usd"],
+            "freight_cost": air_total,
             "transit": "1-3 days",
             "best_for": "Urgent, high-value goods"
         })
@@ -484,10 +688,93 @@ def compare_shipping_options(
         }
     }
 
+
+def compare_shipping_options_batch(
+    origin_country: str,
+    destination_country: str,
+    weights_kg,
+    volumes_cbm
+) -> dict:
+    """
+    Vectorized sea (LCL) vs air freight totals for many cargo rows on one lane.
+    
+    Bulk-RFQ helper, not an agent tool. Needs the optional NumPy package
+    (pip install numpy), which the agent itself does not require; it is imported lazily.
+    Totals are unrounded float64 arrays; a mode without rates for the lane is all NaN.
+    """
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("compare_shipping_options_batch requires NumPy: pip install numpy") from e
+    
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    lane = _lane(origin_country, destination_country)
+    
+    # Materialize one-shot iterators (np.asarray cannot consume a generator)
+    weights = np.asarray(tuple(weights_kg) if isinstance(weights_kg, Iterator) else weights_kg, dtype=np.float64)
+    volumes = np.asarray(tuple(volumes_cbm) if isinstance(volumes_cbm, Iterator) else volumes_cbm, dtype=np.float64)
+    logger.info("⚖️ Batch comparing options: %s (%s rows)", lane, weights.size)
+    
+    sea_total = np.full(weights.shape, np.nan)
+    sea_rates = _SEA_RATES.get(lane)
+    if sea_rates:
+        base = np.maximum(volumes, weights / 1000) * sea_rates[2]
+        sea_total = base + base * _BAF_PCT / 100 + base * _CAF_PCT / 100 + _THC_TOTAL + _DOC_FEE
+    
+    air_total = np.full(weights.shape, np.nan)
+    tiers = _AIR_RATE_TIERS.get(lane)
+    if tiers:
+        tier_rates, min_charge = tiers
+        chargeable = np.maximum(weights, volumes * 1000000 / 6000)
+        rates = np.asarray(tier_rates)[np.searchsorted(_AIR_TIER_BOUNDS, chargeable, side="right")]
+        base = np.maximum(chargeable * rates, min_charge)
+        air_total = base + base * _FUEL_PCT / 100 + chargeable * _SECURITY_PER_KG + _AWB_FEE
+    
+    cheapest = np.where(np.isnan(air_total) | (sea_total <= air_total), "Sea Freight (LCL)", "Air Freight")
+    cheapest = np.where(np.isnan(sea_total) & np.isnan(air_total), "N/A", cheapest)
+    
+    return {
+        "route": lane,
+        "sea_total_usd": sea_total,
+        "air_total_usd": air_total,
+        "cheapest": cheapest
+    }
+
 # =============================================================================
 # DOCUMENT SPECIALIST TOOLS (4 tools)
 # =============================================================================
 
+_DESTINATION_DOCUMENTS = {
+    "USA": [{"name": "ISF (10+2)", "deadline": "24h before departure"}],
+    "Thailand": [{"name": "Form D", "purpose": "ASEAN preferential tariff"}]
+}
+
+
+def _build_document_sets() -> dict:
+    """Frozen (documents, additional) for every (destination, is_sea) combination."""
+    common = [
+        {"name": "Commercial Invoice", "copies": 3, "purpose": "Value declaration for customs"},
+        {"name": "Packing List", "copies": 3, "purpose": "Contents and weights of packages"},
+    ]
+    transport_doc = {
+        True: {"name": "Bill of Lading (B/L)", "copies": "3 originals", "purpose": "Title document"},
+        False: {"name": "Air Waybill (AWB)", "copies": "Original", "purpose": "Contract of carriage"}
+    }
+    origin_doc = {"name": "Certificate of Origin", "copies": 1, "purpose": "For preferential duty rates (RCEP)"}
+    
+    return {
+        (destination, sea): (
+            _frozen(common + [transport_doc[sea], origin_doc]),
+            _frozen(_DESTINATION_DOCUMENTS.get(destination, []))
+        )
+        for destination in (*_DESTINATION_DOCUMENTS, None)
+        for sea in (True, False)
+    }
+
+
+_DOCUMENT_SETS = _build_document_sets()
+
+
 def get_required_documents(
     origin_country: str,
     destination_country: str,
@@ -496,73 +783,83 @@ def get_required_documents(
     """
     Get list of required shipping documents.
     """
-    logger.info(f"📄 Getting documents: {origin_country}→{destination_country} ({transport_mode})")
-    
-    docs = [
-        {"name": "Commercial Invoice", "copies": 3, "purpose": "Value declaration for customs"},
-        {"name": "Packing List", "copies": 3, "purpose": "Contents and weights of packages"},
-    ]
+    origin_country, destination_country = _canon_country(origin_country), _canon_country(destination_country)
+    logger.info("📄 Getting documents: %s→%s (%s)", origin_country, destination_country, transport_mode)
     
-    if transport_mode.lower() == "sea":
-        docs.append({"name": "Bill of Lading (B/L)", "copies": "3 originals", "purpose": "Title document"})
-    else:
-        docs.append({"name": "Air Waybill (AWB)", "copies": "Original", "purpose": "Contract of carriage"})
-    
-    docs.append({"name": "Certificate of Origin", "copies": 1, "purpose": "For preferential duty rates (RCEP)"})
-    
-    additional = []
-    if destination_country == "USA":
-        additional.append({"name": "ISF (10+2)", "deadline": "24h before departure"})
-    if destination_country == "Thailand":
-        additional.append({"name": "Form D", "purpose": "ASEAN preferential tariff"})
+    destination_key = destination_country if destination_country in _DESTINATION_DOCUMENTS else None
+    docs, additional = _DOCUMENT_SETS[(destination_key, transport_mode.lower() == "sea")]
     
     return {
         "status": "success",
         "route": f"{origin_country} → {destination_country}",
         "transport": transport_mode,
-        "required_documents": docs,
-        "additional": additional
+        "required_documents": _thawed(docs),
+        "additional": _thawed(additional)
     }
 
 
-def check_customs_regulations(destination_country: str, product_type: str = "machinery") -> dict:
-    """
-    Check customs regulations for importing goods.
-    """
-    logger.info(f"🛃 Checking regulations: {destination_country} for {product_type}")
-    
-    regs = REGULATIONS_DATA.get(destination_country)
-    if not regs:
-        return {"status": "limited", "message": f"Limited info for {destination_country}"}
-    
-    customs = RATES_DATA["customs"].get(destination_country, {})
-    
-    return {
+_REGULATION_RESPONSES = {
+    country: _frozen({
         "status": "success",
-        "country": destination_country,
-        "vat_rate": f"{customs.get('vat', 'N/A')}%",
+        "country": country,
+        "vat_rate": f"{RATES_DATA['customs'].get(country, {}).get('vat', 'N/A')}%",
         "restricted_items": regs["restricted"],
         "prohibited_items": regs["prohibited"],
         "required_documents": regs["documents"],
         "special_zones": regs["zones"]
-    }
+    })
+    for country, regs in REGULATIONS_DATA.items()
+    if regs
+}
 
 
-def get_hs_code_info(hs_code: str) -> dict:
+def check_customs_regulations(destination_country: str, product_type: str = "machinery") -> dict:
     """
-    Get HS code information and typical duty rates.
+    Check customs regulations for importing goods.
     """
-    logger.info(f"🔢 Looking up HS code: {hs_code}")
+    destination_country = _canon_country(destination_country)
+    logger.info("🛃 Checking regulations: %s for %s", destination_country, product_type)
     
+    response = _REGULATION_RESPONSES.get(destination_country)
+    if response is None:
+        return {"status": "limited", "message": f"Limited info for {destination_country}"}
+    return _thawed(response)
+
+
+@functools.lru_cache(maxsize=1024)
+def _hs_code_info(hs_code: str) -> MappingProxyType:
     info = HS_CODES.get(hs_code[:4])
     if info:
-        return {
+        return _frozen({
             "status": "success",
             "hs_code": hs_code,
             "description": info["desc"],
             "typical_duty": info["duty"]
-        }
-    return {"status": "not_found", "hs_code": hs_code}
+        })
+    return _frozen({"status": "not_found", "hs_code": hs_code})
+
+
+def get_hs_code_info(hs_code: str) -> dict:
+    """
+    Get HS code information and typical duty rates.
+    """
+    logger.info("🔢 Looking up HS code: %s", hs_code)
+    
+    return _thawed(_hs_code_info(hs_code))
+
+
+_CHECKLIST_TASKS = ("Booking confirmation", "Cargo ready", "Departure", "Arrival", "Delivery")
+_CHECKLIST_OFFSETS_SEA = (0, 2, 3, 13, 15)
+_CHECKLIST_OFFSETS_AIR = (0, 2, 3, 6, 8)
+
+
+@functools.lru_cache(maxsize=8)
+def _checklist_timeline(today: date, offsets: tuple) -> tuple:
+    """(day, task, ISO date) rows; only changes when the calendar day does."""
+    return tuple(
+        (day, task, (today + timedelta(days=day)).isoformat())
+        for day, task in zip(offsets, _CHECKLIST_TASKS)
+    )
 
 
 def generate_shipping_checklist(
@@ -573,17 +870,12 @@ def generate_shipping_checklist(
     """
     Generate complete shipping preparation checklist.
     """
-    logger.info(f"📋 Generating checklist: {origin_country}→{destination_country}")
-    
-    today = datetime.now()
-    transit = 3 if transport_mode == "air" else 10
+    logger.info("📋 Generating checklist: %s→%s", origin_country, destination_country)
     
+    offsets = _CHECKLIST_OFFSETS_AIR if transport_mode == "air" else _CHECKLIST_OFFSETS_SEA
     timeline = [
-        {"day": 0, "task": "Booking confirmation", "date": today.strftime("%Y-%m-%d")},
-        {"day": 2, "task": "Cargo ready", "date": (today + timedelta(days=2)).strftime("%Y-%m-%d")},
-        {"day": 3, "task": "Departure", "date": (today + timedelta(days=3)).strftime("%Y-%m-%d")},
-        {"day": 3+transit, "task": "Arrival", "date": (today + timedelta(days=3+transit)).strftime("%Y-%m-%d")},
-        {"day": 5+transit, "task": "Delivery", "date": (today + timedelta(days=5+transit)).strftime("%Y-%m-%d")},
+        {"day": day, "task": task, "date": iso}
+        for day, task, iso in _checklist_timeline(datetime.now().date(), offsets)
     ]
     
     return {
@@ -597,26 +889,58 @@ def generate_shipping_checklist(
 # =============================================================================
 
 customer_memory = {}
-quote_history = []
+# Bounded ring buffer: the oldest quotes fall off once the process has seen 10,000
+quote_history = deque(maxlen=10_000)
+
+# Per-customer view of quote_history: latest 10 quotes plus a running total
+_QUOTE_HISTORY_LIMIT = 10
+_quote_index = {}
+_quote_counts = Counter()
+
+# LRU of per-customer context; entries are dropped whenever that customer's data changes
+_CUSTOMER_CONTEXT_SIZE = 256
+_customer_context = OrderedDict()
+
+
+def _ctx(customer_id: str) -> MappingProxyType:
+    """Saved info and latest quote for a customer, cached until the next save."""
+    ctx = _customer_context.get(customer_id)
+    if ctx is not None:
+        _customer_context.move_to_end(customer_id)
+        return ctx
+    
+    stored = customer_memory.get(customer_id)
+    recent = _quote_index.get(customer_id)
+    ctx = MappingProxyType({
+        "known": stored is not None,
+        "info": MappingProxyType({k: v["value"] for k, v in stored.items()} if stored else {}),
+        "last_quote": recent[-1] if recent else None
+    })
+    _customer_context[customer_id] = ctx
+    if len(_customer_context) > _CUSTOMER_CONTEXT_SIZE:
+        _customer_context.popitem(last=False)
+    return ctx
 
 
 def save_customer_info(customer_id: str, info_type: str, value: str) -> dict:
     """Save customer information for personalized service."""
-    logger.info(f"💾 Saving customer info: {customer_id} - {info_type}")
+    logger.info("💾 Saving customer info: %s - %s", customer_id, info_type)
     
+    customer_id, info_type = sys.intern(customer_id), sys.intern(info_type)
     if customer_id not in customer_memory:
         customer_memory[customer_id] = {}
     customer_memory[customer_id][info_type] = {"value": value, "saved_at": datetime.now().isoformat()}
+    _customer_context.pop(customer_id, None)
     
     return {"status": "success", "message": f"Saved {info_type} for {customer_id}"}
 
 
 def get_customer_info(customer_id: str) -> dict:
     """Retrieve stored customer information."""
-    if customer_id not in customer_memory:
+    ctx = _ctx(customer_id)
+    if not ctx["known"]:
         return {"status": "not_found", "message": f"No info for {customer_id}"}
-    info = {k: v["value"] for k, v in customer_memory[customer_id].items()}
-    return {"status": "success", "customer_id": customer_id, "info": info}
+    return {"status": "success", "customer_id": customer_id, "info": dict(ctx["info"])}
 
 
 def save_quote(
@@ -656,7 +980,10 @@ def save_quote(
     }
     
     quote_history.append(quote)
-    logger.info(f"📝 Quote saved: {quote_id}")
+    _quote_index.setdefault(customer_id, deque(maxlen=_QUOTE_HISTORY_LIMIT)).append(quote)
+    _quote_counts[customer_id] += 1
+    _customer_context.pop(customer_id, None)
+    logger.info("📝 Quote saved: %s", quote_id)
     
     return {"status": "success", "quote_id": quote_id, "valid_until": quote["valid_until"]}
 
@@ -664,10 +991,23 @@ def save_quote(
 def get_quote_history(customer_id: str = None) -> dict:
     """Retrieve quote history."""
     if customer_id:
-        quotes = [q for q in quote_history if q["customer_id"] == customer_id]
-    else:
-        quotes = quote_history
-    return {"status": "success", "count": len(quotes), "quotes": quotes[-10:]}
+        recent = list(_quote_index.get(customer_id, ()))
+        return {"status": "success", "count": _quote_counts[customer_id], "quotes": recent}
+    latest = list(itertools.islice(reversed(quote_history), _QUOTE_HISTORY_LIMIT))[::-1]
+    return {"status": "success", "count": len(quote_history), "quotes": latest}
+
+# =============================================================================
+# TOOL REGISTRY
+# =============================================================================
+
+# Each specialist's tools live here and are attached only to that specialist, so
+# the coordinator's prompt carries nothing but transfer_to_agent.
+_TOOL_REGISTRY = {
+    "route_planner": (search_sea_routes, search_air_routes, recommend_transport_mode),
+    "cost_analyst": (calculate_sea_freight_cost, calculate_air_freight_cost, calculate_total_landed_cost, compare_shipping_options),
+    "document_specialist": (get_required_documents, check_customs_regulations, get_hs_code_info, generate_shipping_checklist),
+    "quote_manager": (save_quote, get_quote_history, save_customer_info, get_customer_info),
+}
 
 # =============================================================================
 # SUB-AGENT DEFINITIONS
@@ -688,7 +1028,7 @@ When asked about routes:
 2. Use recommend_transport_mode to suggest the best option
 3. Present routes clearly with transit times and carriers
 """,
-    tools=[search_sea_routes, search_air_routes, recommend_transport_mode]
+    tools=list(_TOOL_REGISTRY["route_planner"])
 )
 
 cost_analyst_agent = Agent(
@@ -707,7 +1047,7 @@ When asked about costs:
 2. Use calculate_total_landed_cost for complete cost
 3. Use compare_shipping_options to show all options
 """,
-    tools=[calculate_sea_freight_cost, calculate_air_freight_cost, calculate_total_landed_cost, compare_shipping_options]
+    tools=list(_TOOL_REGISTRY["cost_analyst"])
 )
 
 document_specialist_agent = Agent(
@@ -727,7 +1067,7 @@ When asked about documents or customs:
 3. Use get_hs_code_info for tariff classification
 4. Use generate_shipping_checklist for preparation guides
 """,
-    tools=[get_required_documents, check_customs_regulations, get_hs_code_info, generate_shipping_checklist]
+    tools=list(_TOOL_REGISTRY["document_specialist"])
 )
 
 # NEW: Quote Manager Agent for saving and retrieving quotes
@@ -762,9 +1102,68 @@ Call save_quote with:
 
 ALWAYS save when asked. Never say you cannot save.
 """,
-    tools=[save_quote, get_quote_history, save_customer_info, get_customer_info]
+    tools=list(_TOOL_REGISTRY["quote_manager"])
 )
 
+# =============================================================================
+# KEYWORD ROUTING (pre-filter before the LLM router)
+# =============================================================================
+
+# A bare "quote" is deliberately absent: it shows up in both pricing and save-quote requests
+_ROUTE_KEYWORDS = {
+    "route_planner": ["route", "routes", "transit", "carrier", "carriers", "ルート", "航路"],
+    "cost_analyst": ["cost", "costs", "price", "prices", "pricing", "landed", "料金", "費用", "運賃", "コスト"],
+    "document_specialist": [
+        "document", "documents", "documentation", "customs", "regulation", "regulations",
+        "hs code", "checklist", "checklists", "書類", "通関", "規制",
+    ],
+    # Bare "save"/"keep"/"store" also appear in pricing questions ("how much would I save"),
+    # so only unambiguous quote-management phrases route directly
+    "quote_manager": [
+        "save the quote", "save this quote", "save my quote", "quote history",
+        "customer info", "customer information", "保存", "記録", "履歴",
+    ],
+}
+
+
+def _keyword_alternative(keyword: str) -> str:
+    # Word boundaries only make sense for ASCII; Japanese has no spaces between words.
+    # ASCII keywords match whole words only, so inflected forms are listed explicitly above.
+    return rf"\b{re.escape(keyword)}\b" if keyword.isascii() else re.escape(keyword)
+
+
+_ROUTE_PATTERN = re.compile("|".join(
+    f"(?P<{agent}>{'|'.join(_keyword_alternative(kw) for kw in keywords)})"
+    for agent, keywords in _ROUTE_KEYWORDS.items()
+))
+
+
+def _route_by_keywords(text: str) -> Optional[str]:
+    """Specialist name when exactly one specialist's keywords appear in the text, else None."""
+    agents = {match.lastgroup for match in _ROUTE_PATTERN.finditer(text.lower())}
+    return agents.pop() if len(agents) == 1 else None
+
+
+def _keyword_router_callback(callback_context, llm_request) -> Optional[LlmResponse]:
+    """Transfer unambiguous user messages directly, skipping the coordinator's LLM call."""
+    if not llm_request.contents:
+        return None
+    last = llm_request.contents[-1]
+    if last.role != "user":
+        return None
+    text = " ".join(part.text for part in last.parts or [] if part.text)
+    agent = _route_by_keywords(text) if text else None
+    if agent is None:
+        return None
+    
+    logger.info("🧭 Keyword route → %s", agent)
+    return LlmResponse(content=types.Content(
+        role="model",
+        parts=[types.Part(function_call=types.FunctionCall(
+            name="transfer_to_agent", args={"agent_name": agent}
+        ))]
+    ))
+
 # =============================================================================
 # ORCHESTRATOR AGENT
 # =============================================================================
@@ -796,6 +1195,7 @@ Always be professional and provide complete information.
 Respond in the same language as the user.
 """,
     tools=[],  # No direct tools, all delegated to sub-agents
+    before_model_callback=_keyword_router_callback,
     sub_agents=[route_planner_agent, cost_analyst_agent, document_specialist_agent, quote_manager_agent]
 )
 
@@ -806,6 +1206,92 @@ print(f"✅ Coordinator with 4 sub-agents: route_planner, cost_analyst, document
 # DEMO FUNCTION
 # =============================================================================
 
+DEMO_CONCURRENCY = 3
+
+
+@functools.lru_cache(maxsize=1)
+def get_runner() -> Runner:
+    """Process-wide Runner and session store, built on first use and shared by every caller."""
+    return Runner(
+        agent=logistics_coordinator,
+        app_name="logistics_multi_agent",
+        session_service=InMemorySessionService()
+    )
+
+# SSE streaming makes ADK emit partial text events while Gemini is still generating
+STREAMING_RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+def _describe_progress(event) -> list:
+    """Short progress lines for delegations, tool calls and tool results in an event."""
+    lines = []
+    for call in event.get_function_calls():
+        if call.name == "transfer_to_agent":
+            lines.append(f"Delegating to {(call.args or {}).get('agent_name', '?')}...")
+        else:
+            lines.append(f"{event.author} calling {call.name}...")
+    for result in event.get_function_responses():
+        if result.name == "transfer_to_agent":
+            continue
+        count = (result.response or {}).get("count")
+        lines.append(f"{result.name} returned {count} results" if count is not None else f"{result.name} done")
+    return lines
+
+
+async def _ask(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    text: str,
+    stream: bool = False,
+    on_progress: Optional[Callable[[str], None]] = None
+):
+    """
+    Send one user message and yield the reply text.
+    
+    With stream=True, yields partial deltas as Gemini generates them; otherwise
+    yields the text of each final response event. on_progress, if given, is
+    called with a short line for each delegation, tool call and tool result.
+    """
+    content = types.Content(role="user", parts=[types.Part(text=text)])
+    streamed = False
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=content,
+        run_config=STREAMING_RUN_CONFIG if stream else None
+    ):
+        if on_progress is not None and not event.partial:
+            for line in _describe_progress(event):
+                on_progress(line)
+        if not (event.content and event.content.parts):
+            continue
+        part_text = event.content.parts[0].text
+        if event.partial:
+            if stream and part_text:
+                streamed = True
+                yield part_text
+        elif event.is_final_response() and not streamed:
+            # After streaming, the closing event only repeats the text already yielded
+            yield part_text or ""
+
+
+async def stream_response(runner: Runner, user_id: str, session_id: str, text: str) -> str:
+    """Print delegation progress and the agent's reply as they stream in; return the reply."""
+    chunks = []
+    
+    def show_progress(line: str) -> None:
+        # Break out of a partially printed reply so the progress line stands alone
+        print(f"\n   >> {line}" if chunks else f"   >> {line}", flush=True)
+    
+    async for chunk in _ask(runner, user_id, session_id, text, stream=True, on_progress=show_progress):
+        if not chunks:
+            print("\n🤖 Agent: ", end="")
+        print(chunk, end="", flush=True)
+        chunks.append(chunk)
+    print()
+    return "".join(chunks)
+
 async def run_demo():
     """Run demonstration of the multi-agent logistics system."""
     
@@ -817,17 +1303,8 @@ async def run_demo():
         print("❌ Error: GOOGLE_API_KEY not set in .env file")
         return
     
-    session_service = InMemorySessionService()
-    session = await session_service.create_session(
-        app_name="logistics_multi_agent",
-        user_id="demo_customer"
-    )
-    
-    runner = Runner(
-        agent=logistics_coordinator,
-        app_name="logistics_multi_agent",
-        session_service=session_service
-    )
+    runner = get_runner()
+    session_service = runner.session_service
     
     demo_queries = [
         "What shipping routes are available from Japan to China?",
@@ -835,25 +1312,35 @@ async def run_demo():
         "What documents do I need for shipping to China by sea?",
     ]
     
-    for i, query in enumerate(demo_queries, 1):
+    # The queries are independent, so run them side by side; the semaphore caps
+    # concurrent Gemini calls in case of rate limits. Replies are collected rather
+    # than streamed, since concurrent streams would interleave on stdout.
+    limit = asyncio.Semaphore(DEMO_CONCURRENCY)
+    
+    async def _run_query(index: int, query: str) -> str:
+        async with limit:
+            # Fresh session per query: the demo questions are unrelated, so sharing one
+            # history would only grow every prompt. A real conversation (interactive_mode)
+            # keeps one session so follow-ups can refer back to earlier turns.
+            session = await session_service.create_session(
+                app_name="logistics_multi_agent",
+                user_id="demo_customer"
+            )
+            
+            response_text = ""
+            def progress(line: str) -> None:
+                print(f"   [Q{index}] >> {line}", flush=True)
+            
+            async for text in _ask(runner, "demo_customer", session.id, query, on_progress=progress):
+                response_text = text  # the last final response is the answer
+            return response_text
+    
+    responses = await asyncio.gather(*(_run_query(i, query) for i, query in enumerate(demo_queries, 1)))
+    
+    for i, (query, response_text) in enumerate(zip(demo_queries, responses), 1):
         print(f"\n{'='*60}")
         print(f"📝 Query {i}: {query}")
         print(f"{'='*60}")
-        
-        content = types.Content(
-            role="user",
-            parts=[types.Part(text=query)]
-        )
-        
-        response_text = ""
-        async for event in runner.run_async(
-            user_id="demo_customer",
-            session_id=session.id,
-            new_message=content
-        ):
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
-        
         print(f"\n🤖 Response:\n{response_text}")
     
     print(f"\n{'='*70}")
@@ -861,6 +1348,41 @@ async def run_demo():
     print(f"{'='*70}")
 
 
+async def ainput(prompt: str = "") -> str:
+    """input() on a daemon thread, so the event loop keeps running while the user types."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def _deliver(setter, value):
+        if not future.done():
+            setter(value)
+    
+    def _read():
+        try:
+            line = input(prompt)
+        except BaseException as exc:
+            loop.call_soon_threadsafe(_deliver, future.set_exception, exc)
+        else:
+            loop.call_soon_threadsafe(_deliver, future.set_result, line)
+    
+    # Daemon thread: a Ctrl+C exit must not wait for a pending input() to return
+    threading.Thread(target=_read, daemon=True).start()
+    return await future
+
+
+async def _warmup(runner: Runner, session_service: InMemorySessionService, user_id: str) -> None:
+    """Send a throwaway ping in a separate session to prewarm the Gemini connection."""
+    try:
+        session = await session_service.create_session(
+            app_name="logistics_multi_agent",
+            user_id=user_id
+        )
+        async for _ in _ask(runner, user_id, session.id, "hi"):
+            pass
+    except Exception as exc:
+        logger.debug("Warmup failed: %s", exc)
+
+
 async def interactive_mode():
     """Run in interactive mode."""
     
@@ -874,27 +1396,25 @@ async def interactive_mode():
         print("❌ Error: GOOGLE_API_KEY not set")
         return
     
-    session_service = InMemorySessionService()
+    runner = get_runner()
+    session_service = runner.session_service
     
-    customer_id = input("\n👤 Enter customer ID (or press Enter for 'guest'): ").strip() or "guest"
+    customer_id = (await ainput("\n👤 Enter customer ID (or press Enter for 'guest'): ")).strip() or "guest"
     
     session = await session_service.create_session(
         app_name="logistics_multi_agent",
         user_id=customer_id
     )
     
-    runner = Runner(
-        agent=logistics_coordinator,
-        app_name="logistics_multi_agent",
-        session_service=session_service
-    )
+    # Not awaited: connection/auth setup overlaps with the user typing their first message
+    warmup_task = asyncio.create_task(_warmup(runner, session_service, customer_id))
     
     print(f"\n✅ Session started for: {customer_id}")
     print("\nHow can I help you with your shipping needs today?\n")
     
     while True:
         try:
-            user_input = input("👤 You: ").strip()
+            user_input = (await ainput("👤 You: ")).strip()
             
             if user_input.lower() == 'quit':
                 print("\n👋 Thank you for using our service!")
@@ -903,23 +1423,11 @@ async def interactive_mode():
             if not user_input:
                 continue
             
-            content = types.Content(
-                role="user",
-                parts=[types.Part(text=user_input)]
-            )
-            
-            response_text = ""
-            async for event in runner.run_async(
-                user_id=customer_id,
-                session_id=session.id,
-                new_message=content
-            ):
-                if event.is_final_response():
-                    response_text = event.content.parts[0].text
-            
-            print(f"\n🤖 Agent: {response_text}\n")
+            await stream_response(runner, customer_id, session.id, user_input)
+            print()
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # asyncio.run turns Ctrl+C into a cancellation of this task
             print("\n\n👋 Session ended.")
             break
 
@@ -928,7 +1436,12 @@ async def interactive_mode():
 # =============================================================================
 
 if __name__ == "__main__":
-    import sys
+    # uvloop is optional (Linux/macOS); the default asyncio loop is used without it
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     
     if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
         asyncio.run(interactive_mode())
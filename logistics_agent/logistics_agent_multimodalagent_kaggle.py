@@ -1,9 +1,25 @@
 
 import os
+import asyncio
+import itertools
+import json
 import logging
-from datetime import datetime, timedelta
+import sys
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, astuple, dataclass
+from datetime import date, datetime, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Optional
 
+try:
+    import orjson  # Optional: faster snapshot serialization
+except ImportError:
+    orjson = None
+
 from google.colab import userdata
 from google.adk.agents import Agent
 from google.adk.runners import Runner
@@ -157,7 +173,7 @@ print("✅ Dummy data loaded!")
 print(f"   Routes: {len(ROUTES_DATA['sea_routes'])} sea, {len(ROUTES_DATA['air_routes'])} air")
 
 # %% [markdown]
-# ## 🛠️ Custom Tools (11 Tools)
+# ## 🛠️ Custom Tools (12 Tools)
 # 
 # Tools are grouped by specialist agent responsibility.
 
@@ -177,7 +193,7 @@ def search_sea_routes(origin_country: str, destination_country: str) -> dict:
     Returns:
         dict: Available sea routes with carriers and transit times
     """
-    logger.info(f"🔍 Searching sea routes: {origin_country} → {destination_country}")
+    logger.info("🔍 Searching sea routes: %s → %s", origin_country, destination_country)
     
     routes = []
     for route in ROUTES_DATA["sea_routes"]:
@@ -210,7 +226,7 @@ def search_air_routes(origin_country: str, destination_country: str) -> dict:
     Returns:
         dict: Available air routes with carriers and transit times
     """
-    logger.info(f"✈️ Searching air routes: {origin_country} → {destination_country}")
+    logger.info("✈️ Searching air routes: %s → %s", origin_country, destination_country)
     
     routes = []
     for route in ROUTES_DATA["air_routes"]:
@@ -250,7 +266,7 @@ def recommend_transport_mode(
     Returns:
         dict: Recommended transport mode with reasoning
     """
-    logger.info(f"🎯 Recommending mode: {weight_kg}kg, {volume_cbm}CBM, urgency={urgency}")
+    logger.info("🎯 Recommending mode: %skg, %sCBM, urgency=%s", weight_kg, volume_cbm, urgency)
     
     recommendations = []
     
@@ -309,7 +325,7 @@ def calculate_sea_freight_cost(
     Returns:
         dict: Detailed cost breakdown in USD
     """
-    logger.info(f"💰 Calculating sea freight: {origin_country}→{destination_country}, {container_type}")
+    logger.info("💰 Calculating sea freight: %s→%s, %s", origin_country, destination_country, container_type)
     
     lane = f"{origin_country}-{destination_country}"
     rates = RATES_DATA["sea_freight"].get(lane)
@@ -371,7 +387,7 @@ def calculate_air_freight_cost(
     Returns:
         dict: Detailed cost breakdown in USD
     """
-    logger.info(f"✈️ Calculating air freight: {origin_country}→{destination_country}")
+    logger.info("✈️ Calculating air freight: %s→%s", origin_country, destination_country)
     
     lane = f"{origin_country}-{destination_country}"
     rates = RATES_DATA["air_freight"].get(lane)
@@ -443,7 +459,7 @@ def calculate_total_landed_cost(
     Returns:
         dict: Complete landed cost breakdown
     """
-    logger.info(f"📊 Calculating landed cost: ${cargo_value} to {destination_country}")
+    logger.info("📊 Calculating landed cost: $%s to %s", cargo_value, destination_country)
     
     customs = RATES_DATA["customs"].get(destination_country, RATES_DATA["customs"]["China"])
     duty_rate = RATES_DATA["duty_rates"].get(hs_code[:4], 0.05)
@@ -507,7 +523,7 @@ def compare_shipping_options(
     Returns:
         dict: Comparison of all options with recommendation
     """
-    logger.info(f"⚖️ Comparing options: {origin_country}→{destination_country}")
+    logger.info("⚖️ Comparing options: %s→%s", origin_country, destination_country)
     
     options = []
     
@@ -552,6 +568,47 @@ def compare_shipping_options(
 # DOCUMENT SPECIALIST TOOLS (4 tools)
 # =============================================================================
 
+# Case-insensitive lookup so "usa" / " Thailand " resolve to the interned "USA" / "Thailand" keys
+_COUNTRY_NAMES = {name.lower(): sys.intern(name) for name in REGULATIONS_DATA}
+
+
+def _canon_country(name: str) -> str:
+    name = name.strip()
+    return _COUNTRY_NAMES.get(name.lower(), name)
+
+
+class Mode(IntEnum):
+    SEA = 0
+    AIR = 1
+
+
+_MODES = {"sea": Mode.SEA, "air": Mode.AIR}
+
+
+def _parse_mode(transport_mode: str) -> Optional[Mode]:
+    """Mode for "sea"/"air" in any case, None for anything else."""
+    return _MODES.get(transport_mode.strip().lower())
+
+
+# Document blueprints, built once at import (read-only; copied out per call)
+_DOC_COMMERCIAL_INVOICE = MappingProxyType({"name": "Commercial Invoice", "copies": 3, "purpose": "Value declaration for customs"})
+_DOC_PACKING_LIST = MappingProxyType({"name": "Packing List", "copies": 3, "purpose": "Contents and weights of packages"})
+_DOC_BL = MappingProxyType({"name": "Bill of Lading (B/L)", "copies": "3 originals", "purpose": "Title document, proof of shipment"})
+_DOC_AWB = MappingProxyType({"name": "Air Waybill (AWB)", "copies": "Original", "purpose": "Contract of carriage"})
+_DOC_COO = MappingProxyType({"name": "Certificate of Origin", "copies": 1, "purpose": "For preferential duty rates (RCEP)"})
+_DOC_ISF = MappingProxyType({"name": "ISF (10+2)", "deadline": "24h before departure", "purpose": "Security filing"})
+_DOC_FORM_D = MappingProxyType({"name": "Form D", "purpose": "ASEAN preferential tariff"})
+
+_BASE_DOCS_SEA = (_DOC_COMMERCIAL_INVOICE, _DOC_PACKING_LIST, _DOC_BL, _DOC_COO)
+_BASE_DOCS_AIR = (_DOC_COMMERCIAL_INVOICE, _DOC_PACKING_LIST, _DOC_AWB, _DOC_COO)
+
+# Destination specific
+_ADDITIONAL_DOCS_BY_COUNTRY = {
+    "USA": (_DOC_ISF,),
+    "Thailand": (_DOC_FORM_D,),
+}
+
+
 def get_required_documents(
     origin_country: str,
     destination_country: str,
@@ -568,38 +625,38 @@ def get_required_documents(
     Returns:
         dict: Required documents with descriptions
     """
-    logger.info(f"📄 Getting documents: {origin_country}→{destination_country} ({transport_mode})")
-    
-    docs = [
-        {"name": "Commercial Invoice", "copies": 3, "purpose": "Value declaration for customs"},
-        {"name": "Packing List", "copies": 3, "purpose": "Contents and weights of packages"},
-    ]
-    
-    if transport_mode.lower() == "sea":
-        docs.append({"name": "Bill of Lading (B/L)", "copies": "3 originals", "purpose": "Title document, proof of shipment"})
-    else:
-        docs.append({"name": "Air Waybill (AWB)", "copies": "Original", "purpose": "Contract of carriage"})
-    
-    docs.append({"name": "Certificate of Origin", "copies": 1, "purpose": "For preferential duty rates (RCEP)"})
+    logger.info("📄 Getting documents: %s→%s (%s)", origin_country, destination_country, transport_mode)
     
-    # Destination specific
-    regs = REGULATIONS_DATA.get(destination_country, {})
-    additional = []
-    if destination_country == "USA":
-        additional.append({"name": "ISF (10+2)", "deadline": "24h before departure", "purpose": "Security filing"})
-    if destination_country == "Thailand":
-        additional.append({"name": "Form D", "purpose": "ASEAN preferential tariff"})
+    docs = _BASE_DOCS_SEA if _parse_mode(transport_mode) is Mode.SEA else _BASE_DOCS_AIR
+    additional = _ADDITIONAL_DOCS_BY_COUNTRY.get(_canon_country(destination_country), ())
     
+    # ADK serializes tool results, so hand back plain copies of the shared entries
     return {
         "status": "success",
         "route": f"{origin_country} → {destination_country}",
         "transport": transport_mode,
-        "required_documents": docs,
-        "additional": additional,
+        "required_documents": [dict(d) for d in docs],
+        "additional": [dict(d) for d in additional],
         "tip": "RCEP Certificate of Origin can reduce duties for Japan-China/Thailand shipments"
     }
 
 
+# Country-specific part of each customs response, built once (only product_type varies per call)
+_CUSTOMS_RESPONSES = {
+    country: {
+        "status": "success",
+        "country": country,
+        "vat_rate": f"{RATES_DATA['customs'].get(country, {}).get('vat', 'N/A')}%",
+        "restricted_items": regs["restricted"],
+        "prohibited_items": regs["prohibited"],
+        "required_documents": regs["documents"],
+        "special_zones": regs["zones"],
+        "note": "Verify specific requirements with licensed customs broker"
+    }
+    for country, regs in REGULATIONS_DATA.items()
+}
+
+
 def check_customs_regulations(destination_country: str, product_type: str = "machinery") -> dict:
     """
     Check customs regulations for importing goods.
@@ -611,26 +668,21 @@ def check_customs_regulations(destination_country: str, product_type: str = "mac
     Returns:
         dict: Regulations, restrictions, and requirements
     """
-    logger.info(f"🛃 Checking regulations: {destination_country} for {product_type}")
+    logger.info("🛃 Checking regulations: %s for %s", destination_country, product_type)
     
-    regs = REGULATIONS_DATA.get(destination_country)
+    base = _CUSTOMS_RESPONSES.get(_canon_country(destination_country))
     
-    if not regs:
+    if not base:
         return {"status": "limited", "message": f"Limited info for {destination_country}"}
     
-    customs = RATES_DATA["customs"].get(destination_country, {})
-    
-    return {
-        "status": "success",
-        "country": destination_country,
-        "product_type": product_type,
-        "vat_rate": f"{customs.get('vat', 'N/A')}%",
-        "restricted_items": regs["restricted"],
-        "prohibited_items": regs["prohibited"],
-        "required_documents": regs["documents"],
-        "special_zones": regs["zones"],
-        "note": "Verify specific requirements with licensed customs broker"
-    }
+    return {**base, "product_type": product_type}
+
+
+@lru_cache(maxsize=1024)
+def _hs_lookup(prefix: str) -> Optional[tuple]:
+    """(description, typical duty) for a 4-digit HS heading, or None."""
+    info = HS_CODES.get(prefix)
+    return (info["desc"], info["duty"]) if info else None
 
 
 def get_hs_code_info(hs_code: str) -> dict:
@@ -643,22 +695,58 @@ def get_hs_code_info(hs_code: str) -> dict:
     Returns:
         dict: HS code description and duty information
     """
-    logger.info(f"🔢 Looking up HS code: {hs_code}")
+    logger.info("🔢 Looking up HS code: %s", hs_code)
     
-    info = HS_CODES.get(hs_code[:4])
+    info = _hs_lookup(hs_code[:4])
     
     if info:
         return {
             "status": "success",
             "hs_code": hs_code,
-            "description": info["desc"],
-            "typical_duty": info["duty"],
+            "description": info[0],
+            "typical_duty": info[1],
             "note": "Actual classification determined by customs authority"
         }
     
     return {"status": "not_found", "hs_code": hs_code, "message": "Not in database"}
 
 
+# Timeline tasks and their day offsets (transit: 10 days sea, 3 days air)
+_TIMELINE_TASKS = (
+    "Booking confirmation",
+    "Cargo ready, documents prepared",
+    "Export customs, departure",
+    "Arrival at destination",
+    "Import customs, delivery",
+)
+_TIMELINE_OFFSETS = {
+    Mode.SEA: (0, 2, 3, 13, 15),
+    Mode.AIR: (0, 2, 3, 6, 8),
+}
+
+# Static checklist, shared read-only across calls
+_CHECKLIST = MappingProxyType({
+    "pre_shipment": (
+        "✓ Confirm order details with buyer",
+        "✓ Book cargo space with carrier",
+        "✓ Prepare Commercial Invoice",
+        "✓ Prepare Packing List",
+        "✓ Obtain Certificate of Origin",
+        "✓ Arrange cargo insurance"
+    ),
+    "at_shipment": (
+        "✓ Verify cargo weight and dimensions",
+        "✓ Take photos of cargo condition",
+        "✓ Get signed delivery receipt"
+    ),
+    "post_shipment": (
+        "✓ Send documents to consignee",
+        "✓ Track shipment status",
+        "✓ Coordinate customs clearance"
+    )
+})
+
+
 def generate_shipping_checklist(
     origin_country: str,
     destination_country: str,
@@ -675,46 +763,65 @@ def generate_shipping_checklist(
     Returns:
         dict: Step-by-step checklist with timeline
     """
-    logger.info(f"📋 Generating checklist: {origin_country}→{destination_country}")
+    logger.info("📋 Generating checklist: %s→%s", origin_country, destination_country)
     
-    today = datetime.now()
-    transit = 3 if transport_mode == "air" else 10
+    base = date.today().toordinal()
+    offsets = _TIMELINE_OFFSETS.get(_parse_mode(transport_mode), _TIMELINE_OFFSETS[Mode.SEA])
     
     timeline = [
-        {"day": 0, "task": "Booking confirmation", "date": today.strftime("%Y-%m-%d")},
-        {"day": 2, "task": "Cargo ready, documents prepared", "date": (today + timedelta(days=2)).strftime("%Y-%m-%d")},
-        {"day": 3, "task": "Export customs, departure", "date": (today + timedelta(days=3)).strftime("%Y-%m-%d")},
-        {"day": 3+transit, "task": "Arrival at destination", "date": (today + timedelta(days=3+transit)).strftime("%Y-%m-%d")},
-        {"day": 5+transit, "task": "Import customs, delivery", "date": (today + timedelta(days=5+transit)).strftime("%Y-%m-%d")},
+        {"day": day, "task": task, "date": date.fromordinal(base + day).isoformat()}
+        for day, task in zip(offsets, _TIMELINE_TASKS)
     ]
     
-    checklist = {
-        "pre_shipment": [
-            "✓ Confirm order details with buyer",
-            "✓ Book cargo space with carrier",
-            "✓ Prepare Commercial Invoice",
-            "✓ Prepare Packing List",
-            "✓ Obtain Certificate of Origin",
-            "✓ Arrange cargo insurance"
-        ],
-        "at_shipment": [
-            "✓ Verify cargo weight and dimensions",
-            "✓ Take photos of cargo condition",
-            "✓ Get signed delivery receipt"
-        ],
-        "post_shipment": [
-            "✓ Send documents to consignee",
-            "✓ Track shipment status",
-            "✓ Coordinate customs clearance"
-        ]
+    return {
+        "status": "success",
+        "route": f"{origin_country} → {destination_country}",
+        "transport": transport_mode,
+        "timeline": timeline,
+        "checklist": {stage: list(items) for stage, items in _CHECKLIST.items()}
     }
+
+# %%
+# =============================================================================
+# QUOTE BUNDLE (1 tool, used directly by the orchestrator)
+# =============================================================================
+
+def get_quote_bundle(
+    origin_country: str,
+    destination_country: str,
+    weight_kg: float,
+    volume_cbm: float,
+    cargo_value: float,
+    transport_mode: str = "sea"
+) -> dict:
+    """
+    Build a full quote (routes, cost comparison, documents) in one call.
+    
+    Args:
+        origin_country: Origin country
+        destination_country: Destination country
+        weight_kg: Cargo weight in kg
+        volume_cbm: Cargo volume in CBM
+        cargo_value: Cargo value in USD
+        transport_mode: "sea" or "air" (selects routes and documents)
+    
+    Returns:
+        dict: Routes, cost comparison and required documents
+    """
+    logger.info("📦 Building quote bundle: %s→%s (%s)", origin_country, destination_country, transport_mode)
+    
+    if _parse_mode(transport_mode) is Mode.AIR:
+        routes = search_air_routes(origin_country, destination_country)
+    else:
+        routes = search_sea_routes(origin_country, destination_country)
     
     return {
         "status": "success",
         "route": f"{origin_country} → {destination_country}",
         "transport": transport_mode,
-        "timeline": timeline,
-        "checklist": checklist
+        "routes": routes,
+        "costs": compare_shipping_options(origin_country, destination_country, weight_kg, volume_cbm, cargo_value),
+        "documents": get_required_documents(origin_country, destination_country, transport_mode)
     }
 
 # %% [markdown]
@@ -727,9 +834,98 @@ def generate_shipping_checklist(
 # MEMORY TOOLS (Shared)
 # =============================================================================
 
+@dataclass(slots=True, frozen=True)
+class Quote:
+    """A saved quote; stored as slots and turned into a dict only when returned."""
+    quote_id: str
+    customer_id: str
+    created: str
+    origin: str
+    destination: str
+    cargo: str
+    cost_usd: float
+    mode: str
+    valid_until: str
+
+
 # Global storage (in production, use database)
-customer_memory = {}
-quote_history = []
+# Customer info is keyed flat on (customer_id, info_type) -> (value, saved_at);
+# _customer_keys keeps each customer's info types in insertion order for reads
+_customer_info = {}
+_customer_keys = {}
+
+# Capped at the newest 10,000 quotes; older ones are evicted first-in, first-out
+quote_history = deque(maxlen=10_000)
+
+# Per-customer index: the last 10 quotes plus a running total, so lookups skip the full scan
+_quotes_by_customer = {}
+_quote_counts = Counter()
+
+# Timestamp shared by every save inside a frozen_now() block (e.g. a batch import)
+_now_override = ContextVar("now_override", default=None)
+
+
+@contextmanager
+def frozen_now():
+    """Pin _now() to a single timestamp for the duration of the block."""
+    token = _now_override.set(datetime.now())
+    try:
+        yield
+    finally:
+        _now_override.reset(token)
+
+
+def _now() -> datetime:
+    return _now_override.get() or datetime.now()
+
+
+# Quote IDs: Q + YYYYMMDD + running sequence (unique even for several saves per second)
+_quote_seq = itertools.count(1)
+_quote_day = None
+_quote_prefix = ""
+
+def _store_quote(quote: Quote) -> None:
+    quote_history.append(quote)
+    customer_id = quote.customer_id
+    if customer_id not in _quotes_by_customer:
+        _quotes_by_customer[customer_id] = deque(maxlen=10)
+    _quotes_by_customer[customer_id].append(quote)
+    _quote_counts[customer_id] += 1
+
+
+def snapshot() -> bytes:
+    """Serialize customer info and quote history as flat rows (orjson if installed)."""
+    state = {
+        "customers": [(cid, key, value, saved_at) for (cid, key), (value, saved_at) in _customer_info.items()],
+        "quotes": [astuple(q) for q in quote_history],
+    }
+    if orjson is not None:
+        return orjson.dumps(state)
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def restore(data: bytes) -> None:
+    """Replace the in-memory stores with a snapshot() payload."""
+    global _quote_seq
+    
+    state = orjson.loads(data) if orjson is not None else json.loads(data)
+    
+    _customer_info.clear()
+    _customer_keys.clear()
+    for customer_id, info_type, value, saved_at in state["customers"]:
+        _customer_info[(customer_id, info_type)] = (value, saved_at)
+        _customer_keys.setdefault(customer_id, {})[info_type] = None
+    
+    quote_history.clear()
+    _quotes_by_customer.clear()
+    _quote_counts.clear()
+    for row in state["quotes"]:
+        _store_quote(Quote(*row))
+    
+    # Continue numbering past restored IDs so new quotes never collide with them.
+    # The sequence is everything after the 9-character "Q{YYYYMMDD}" prefix (it can outgrow 6 digits).
+    last_seq = max((int(q.quote_id[9:]) for q in quote_history), default=0)
+    _quote_seq = itertools.count(last_seq + 1)
 
 
 def save_customer_info(customer_id: str, info_type: str, value: str) -> dict:
@@ -744,15 +940,10 @@ def save_customer_info(customer_id: str, info_type: str, value: str) -> dict:
     Returns:
         dict: Confirmation
     """
-    logger.info(f"💾 Saving customer info: {customer_id} - {info_type}")
+    logger.info("💾 Saving customer info: %s - %s", customer_id, info_type)
     
-    if customer_id not in customer_memory:
-        customer_memory[customer_id] = {}
-    
-    customer_memory[customer_id][info_type] = {
-        "value": value,
-        "saved_at": datetime.now().isoformat()
-    }
+    _customer_info[(customer_id, info_type)] = (value, _now().isoformat())
+    _customer_keys.setdefault(customer_id, {})[info_type] = None
     
     return {"status": "success", "message": f"Saved {info_type} for {customer_id}"}
 
@@ -767,10 +958,11 @@ def get_customer_info(customer_id: str) -> dict:
     Returns:
         dict: Customer's stored information
     """
-    if customer_id not in customer_memory:
+    keys = _customer_keys.get(customer_id)
+    if keys is None:
         return {"status": "not_found", "message": f"No info for {customer_id}"}
     
-    info = {k: v["value"] for k, v in customer_memory[customer_id].items()}
+    info = {k: _customer_info[(customer_id, k)][0] for k in keys}
     return {"status": "success", "customer_id": customer_id, "info": info}
 
 
@@ -796,24 +988,30 @@ def save_quote(
     Returns:
         dict: Quote reference number
     """
-    quote_id = f"Q{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
-    quote = {
-        "quote_id": quote_id,
-        "customer_id": customer_id,
-        "created": datetime.now().isoformat(),
-        "origin": origin,
-        "destination": destination,
-        "cargo": cargo_desc,
-        "cost_usd": total_cost,
-        "mode": transport_mode,
-        "valid_until": (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-    }
+    global _quote_day, _quote_prefix
+    
+    now = _now()
+    if now.date() != _quote_day:
+        _quote_day = now.date()
+        _quote_prefix = _quote_day.strftime("%Y%m%d")
+    quote_id = f"Q{_quote_prefix}{next(_quote_seq):06d}"
+    
+    quote = Quote(
+        quote_id=quote_id,
+        customer_id=customer_id,
+        created=now.isoformat(),
+        origin=origin,
+        destination=destination,
+        cargo=cargo_desc,
+        cost_usd=total_cost,
+        mode=transport_mode,
+        valid_until=(now + timedelta(days=30)).strftime("%Y-%m-%d")
+    )
     
-    quote_history.append(quote)
-    logger.info(f"📝 Quote saved: {quote_id}")
+    _store_quote(quote)
+    logger.info("📝 Quote saved: %s", quote_id)
     
-    return {"status": "success", "quote_id": quote_id, "valid_until": quote["valid_until"]}
+    return {"status": "success", "quote_id": quote_id, "valid_until": quote.valid_until}
 
 
 def get_quote_history(customer_id: str = None) -> dict:
@@ -827,11 +1025,13 @@ def get_quote_history(customer_id: str = None) -> dict:
         dict: List of quotes
     """
     if customer_id:
-        quotes = [q for q in quote_history if q["customer_id"] == customer_id]
+        count = _quote_counts[customer_id]
+        quotes = list(_quotes_by_customer.get(customer_id, ()))
     else:
-        quotes = quote_history
+        count = len(quote_history)
+        quotes = list(itertools.islice(reversed(quote_history), 10))[::-1]
     
-    return {"status": "success", "count": len(quotes), "quotes": quotes[-10:]}
+    return {"status": "success", "count": count, "quotes": [asdict(q) for q in quotes]}
 
 # %% [markdown]
 # ## 🤖 Multi-Agent System Definition
@@ -843,6 +1043,12 @@ def get_quote_history(customer_id: str = None) -> dict:
 # SUB-AGENT DEFINITIONS
 # =============================================================================
 
+# Tool sets per specialist, defined once and shared
+_ROUTE_TOOLS = (search_sea_routes, search_air_routes, recommend_transport_mode)
+_COST_TOOLS = (calculate_sea_freight_cost, calculate_air_freight_cost, calculate_total_landed_cost, compare_shipping_options)
+_DOC_TOOLS = (get_required_documents, check_customs_regulations, get_hs_code_info, generate_shipping_checklist)
+_QUOTE_TOOLS = (save_quote, get_quote_history, save_customer_info, get_customer_info)
+
 # 1. Route Planner Agent
 route_planner_agent = Agent(
     model="gemini-2.0-flash",
@@ -865,7 +1071,7 @@ Always consider:
 - Cargo weight and volume
 - Available carriers and frequencies
 """,
-    tools=[search_sea_routes, search_air_routes, recommend_transport_mode]
+    tools=list(_ROUTE_TOOLS)
 )
 
 # 2. Cost Analyst Agent  
@@ -891,7 +1097,7 @@ Always provide:
 - Validity period of the quote
 - Recommendations based on cost vs. time trade-offs
 """,
-    tools=[calculate_sea_freight_cost, calculate_air_freight_cost, calculate_total_landed_cost, compare_shipping_options]
+    tools=list(_COST_TOOLS)
 )
 
 # 3. Document Specialist Agent
@@ -919,7 +1125,7 @@ Always highlight:
 - Restricted or prohibited items
 - Tips for smooth customs clearance
 """,
-    tools=[get_required_documents, check_customs_regulations, get_hs_code_info, generate_shipping_checklist]
+    tools=list(_DOC_TOOLS)
 )
 
 # 4. Quote Manager Agent (NEW)
@@ -953,7 +1159,7 @@ Call save_quote with:
 
 ALWAYS save when asked. Never say you cannot save.
 """,
-    tools=[save_quote, get_quote_history, save_customer_info, get_customer_info]
+    tools=list(_QUOTE_TOOLS)
 )
 
 print("✅ Sub-agents created (4 agents)!")
@@ -982,6 +1188,8 @@ DELEGATION RULES:
 - Save quote / store quote / keep quote → Transfer to quote_manager
 - Quote history → Transfer to quote_manager
 - Customer info → Transfer to quote_manager
+- Full quote in one request (routes + costs + documents, with weight, volume
+  and value given) → call get_quote_bundle yourself instead of delegating
 
 IMPORTANT: When user asks to save a quote (save this quote, store quote, etc.),
 ALWAYS delegate to quote_manager agent.
@@ -990,7 +1198,7 @@ Always be professional, accurate, and helpful.
 Provide complete information in a well-organized format.
 Respond in the same language as the user.
 """,
-    tools=[],  # No direct tools, all delegated to sub-agents
+    tools=[get_quote_bundle],  # Full-quote shortcut; everything else is delegated
     sub_agents=[route_planner_agent, cost_analyst_agent, document_specialist_agent, quote_manager_agent]
 )
 
@@ -1042,11 +1250,7 @@ async def run_demo():
         "Please save this quote for future reference.",
     ]
     
-    for i, query in enumerate(demo_queries, 1):
-        print(f"\n{'='*60}")
-        print(f"📝 Query {i}: {query}")
-        print(f"{'='*60}")
-        
+    async def _run(session_id: str, query: str) -> str:
         content = types.Content(
             role="user",
             parts=[types.Part(text=query)]
@@ -1055,12 +1259,36 @@ async def run_demo():
         response_text = ""
         async for event in runner.run_async(
             user_id="demo_customer",
-            session_id=session.id,
+            session_id=session_id,
             new_message=content
         ):
             if event.is_final_response():
                 response_text = event.content.parts[0].text
-        
+        return response_text
+    
+    # Queries 1-3 are independent, so their LLM round-trips overlap. Query 2 runs in the
+    # main session because query 4 ("save this quote") needs its result in context;
+    # 1 and 3 get their own sessions so concurrent turns never share one session.
+    route_query, cost_query, docs_query, save_query = demo_queries
+    
+    async def _run_side(query: str) -> str:
+        side = await session_service.create_session(
+            app_name="logistics_multi_agent",
+            user_id="demo_customer"
+        )
+        return await _run(side.id, query)
+    
+    responses = list(await asyncio.gather(
+        _run_side(route_query),
+        _run(session.id, cost_query),
+        _run_side(docs_query),
+    ))
+    responses.append(await _run(session.id, save_query))
+    
+    for i, (query, response_text) in enumerate(zip(demo_queries, responses), 1):
+        print(f"\n{'='*60}")
+        print(f"📝 Query {i}: {query}")
+        print(f"{'='*60}")
         print(f"\n🤖 Response:\n{response_text}")
     
     print(f"\n{'='*70}")
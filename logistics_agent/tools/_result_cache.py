@@ -0,0 +1,46 @@
+"""
+Tool result caching helpers
+ツール結果のキャッシュ（共有するのは読み取り専用のコピー、呼び出し元には毎回新しいdictを返す）
+"""
+
+from functools import lru_cache, wraps
+from types import MappingProxyType
+
+
+def _frozen(value):
+    """読み取り専用のコピー（dict -> MappingProxyType, list -> tuple）"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+def _thawed(value):
+    """読み取り専用のコピーから作り直した、変更可能な新しいコピー"""
+    if isinstance(value, MappingProxyType):
+        return {k: _thawed(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thawed(v) for v in value]
+    return value
+
+
+def cached_tool(maxsize: int = 256):
+    """
+    決定的なツール関数の結果をキャッシュするデコレーター
+    キャッシュには読み取り専用のコピーを保存し、呼び出しごとに新しいdict/listを返すので、
+    呼び出し元が結果を変更してもキャッシュや元データには影響しない
+    """
+    def decorator(func):
+        @lru_cache(maxsize=maxsize)
+        def frozen_call(*args, **kwargs):
+            return _frozen(func(*args, **kwargs))
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return _thawed(frozen_call(*args, **kwargs))
+
+        wrapper.cache_info = frozen_call.cache_info
+        wrapper.cache_clear = frozen_call.cache_clear
+        return wrapper
+    return decorator
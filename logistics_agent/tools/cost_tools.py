@@ -5,20 +5,103 @@ Cost Calculation Tools for Logistics Agent
 
 import json
 import os
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Optional
 
+from ._result_cache import cached_tool
+
+try:
+    from orjson import loads as _json_loads  # Optional: faster parsing
+except ImportError:
+    _json_loads = json.loads
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
+# Estimate duties (simplified) - HS上4桁ごとの関税率
+_DUTY_RATES = MappingProxyType({
+    "8471": 0.03,  # Computers
+    "8479": 0.05,  # Machinery
+    "8501": 0.08,  # Motors
+    "8517": 0.02,  # Communication equipment
+})
+
+# VAT (estimated)
+_VAT_RATES = MappingProxyType({"China": 0.13, "Thailand": 0.07, "USA": 0, "Europe": 0.20})
+
 
+@lru_cache(maxsize=1)
 def load_rates_data() -> dict:
-    """料金データを読み込む"""
+    """料金データを読み込む（初回のみファイルを読み込み、以降はキャッシュを返す）"""
     rates_file = os.path.join(DATA_DIR, "rates.json")
     if os.path.exists(rates_file):
-        with open(rates_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(rates_file, "rb") as f:
+            return _json_loads(f.read())
     return {}
 
 
+@lru_cache(maxsize=None)
+def _lane_index(section: str, table: str) -> dict:
+    """レーン表の索引 {(origin, destination): rates}（国名は小文字）"""
+    index = {}
+    for lane, lane_rates in load_rates_data().get(section, {}).get(table, {}).items():
+        origin, _, destination = lane.partition("-")
+        index[(origin.strip().lower(), destination.strip().lower())] = lane_rates
+    return index
+
+
+# 追加料金（デフォルト値解決済み）
+_SeaSurcharges = namedtuple("SeaSurcharges", "baf_pct caf_pct thc_origin thc_dest doc_fee seal_fee")
+_AirSurcharges = namedtuple("AirSurcharges", "fuel_pct security_per_kg awb_fee handling_per_kg dim_factor")
+
+
+@lru_cache(maxsize=1)
+def _sea_tables() -> tuple:
+    """海上運賃のレーン索引と追加料金"""
+    sea_rates = load_rates_data().get("sea_freight_rates", {})
+    surcharges = sea_rates.get("surcharges", {})
+    return _lane_index("sea_freight_rates", "base_rates_per_cbm"), _SeaSurcharges(
+        baf_pct=surcharges.get("BAF", {}).get("rate_percent", 15),
+        caf_pct=surcharges.get("CAF", {}).get("rate_percent", 5),
+        thc_origin=surcharges.get("THC_origin", {}).get("rate_usd", 150),
+        thc_dest=surcharges.get("THC_destination", {}).get("rate_usd", 180),
+        doc_fee=surcharges.get("documentation_fee", {}).get("rate_usd", 50),
+        seal_fee=surcharges.get("seal_fee", {}).get("rate_usd", 15),
+    )
+
+
+@lru_cache(maxsize=1)
+def _air_tables() -> tuple:
+    """航空運賃のレーン索引と追加料金"""
+    air_rates = load_rates_data().get("air_freight_rates", {})
+    surcharges = air_rates.get("surcharges", {})
+    return _lane_index("air_freight_rates", "base_rates_per_kg"), _AirSurcharges(
+        fuel_pct=surcharges.get("fuel_surcharge_percent", 25),
+        security_per_kg=surcharges.get("security_surcharge_per_kg", 0.15),
+        awb_fee=surcharges.get("AWB_fee", 30),
+        handling_per_kg=surcharges.get("handling_fee_per_kg", 0.25),
+        dim_factor=air_rates.get("dimensional_factor", 6000),
+    )
+
+
+def _sea_totals(
+    base_freight: float,
+    baf_pct: float,
+    caf_pct: float,
+    thc_origin: float,
+    thc_dest: float,
+    doc_fee: float,
+    seal_fee: float
+) -> tuple:
+    """海上運賃の追加料金と合計（数値のみの計算）→ (baf, caf, freight_total, charges_total, grand_total)"""
+    baf = base_freight * baf_pct / 100
+    caf = base_freight * caf_pct / 100
+    total_freight = base_freight + baf + caf
+    total_charges = thc_origin + thc_dest + doc_fee + seal_fee
+    return baf, caf, total_freight, total_charges, total_freight + total_charges
+
+
 def calculate_sea_freight_cost(
     origin_country: str,
     destination_country: str,
@@ -40,25 +123,28 @@ def calculate_sea_freight_cost(
     Returns:
         dict: Detailed cost breakdown in USD
     """
-    rates = load_rates_data()
-    sea_rates = rates.get("sea_freight_rates", {})
-    
+    lanes, surcharges = _sea_tables()
+    return _sea_freight_cost(
+        lanes, surcharges, origin_country, destination_country,
+        cargo_weight_kg, cargo_volume_cbm, container_type
+    )
+
+
+def _sea_freight_cost(
+    lanes: dict,
+    surcharges: _SeaSurcharges,
+    origin_country: str,
+    destination_country: str,
+    cargo_weight_kg: float,
+    cargo_volume_cbm: float,
+    container_type: str
+) -> dict:
+    """calculate_sea_freight_cost 本体（レーン索引と追加料金を引数で受け取る）"""
     # Determine lane
     lane = f"{origin_country}-{destination_country}"
-    base_rates = sea_rates.get("base_rates_per_cbm", {}).get(lane)
-    
-    if not base_rates:
-        # Try reverse mapping for common routes
-        lane_mapping = {
-            "Japan-China": ["Japan-China"],
-            "Japan-Thailand": ["Japan-Thailand"],
-            "Japan-USA": ["Japan-USA"],
-            "Japan-Europe": ["Japan-Europe"],
-        }
-        for key in lane_mapping:
-            if origin_country in key and destination_country.lower() in key.lower():
-                base_rates = sea_rates.get("base_rates_per_cbm", {}).get(key)
-                break
+    base_rates = lanes.get(
+        (origin_country.strip().lower(), destination_country.strip().lower())
+    )
     
     if not base_rates:
         return {
@@ -66,8 +152,6 @@ def calculate_sea_freight_cost(
             "message": f"No rates available for {lane}. Please contact sales for a custom quote."
         }
     
-    surcharges = sea_rates.get("surcharges", {})
-    
     # Calculate base freight
     if container_type == "LCL":
         # LCL charged by CBM or weight (1 CBM = 1000 kg), whichever is greater
@@ -78,18 +162,15 @@ def calculate_sea_freight_cost(
         base_freight = base_rates.get(container_type, base_rates.get("20ft", 200))
         container_info = f"{container_type} Container"
     
-    # Calculate surcharges
-    baf = base_freight * surcharges.get("BAF", {}).get("rate_percent", 15) / 100
-    caf = base_freight * surcharges.get("CAF", {}).get("rate_percent", 5) / 100
-    thc_origin = surcharges.get("THC_origin", {}).get("rate_usd", 150)
-    thc_dest = surcharges.get("THC_destination", {}).get("rate_usd", 180)
-    doc_fee = surcharges.get("documentation_fee", {}).get("rate_usd", 50)
-    seal_fee = surcharges.get("seal_fee", {}).get("rate_usd", 15) if container_type != "LCL" else 0
-    
-    # Total calculation
-    total_freight = base_freight + baf + caf
-    total_charges = thc_origin + thc_dest + doc_fee + seal_fee
-    grand_total = total_freight + total_charges
+    # Calculate surcharges and totals
+    thc_origin = surcharges.thc_origin
+    thc_dest = surcharges.thc_dest
+    doc_fee = surcharges.doc_fee
+    seal_fee = surcharges.seal_fee if container_type != "LCL" else 0
+    baf, caf, total_freight, total_charges, grand_total = _sea_totals(
+        base_freight, surcharges.baf_pct, surcharges.caf_pct,
+        thc_origin, thc_dest, doc_fee, seal_fee
+    )
     
     return {
         "status": "success",
@@ -141,18 +222,27 @@ def calculate_air_freight_cost(
     Returns:
         dict: Detailed cost breakdown in USD
     """
-    rates = load_rates_data()
-    air_rates = rates.get("air_freight_rates", {})
-    
+    lanes, surcharges = _air_tables()
+    return _air_freight_cost(
+        lanes, surcharges, origin_country, destination_country,
+        cargo_weight_kg, cargo_volume_cbm
+    )
+
+
+def _air_freight_cost(
+    lanes: dict,
+    surcharges: _AirSurcharges,
+    origin_country: str,
+    destination_country: str,
+    cargo_weight_kg: float,
+    cargo_volume_cbm: float
+) -> dict:
+    """calculate_air_freight_cost 本体（レーン索引と追加料金を引数で受け取る）"""
     # Determine lane
     lane = f"{origin_country}-{destination_country}"
-    base_rates = air_rates.get("base_rates_per_kg", {}).get(lane)
-    
-    if not base_rates:
-        for key in air_rates.get("base_rates_per_kg", {}).keys():
-            if origin_country in key and destination_country.lower() in key.lower():
-                base_rates = air_rates.get("base_rates_per_kg", {}).get(key)
-                break
+    base_rates = lanes.get(
+        (origin_country.strip().lower(), destination_country.strip().lower())
+    )
     
     if not base_rates:
         return {
@@ -160,11 +250,8 @@ def calculate_air_freight_cost(
             "message": f"No air freight rates available for {lane}."
         }
     
-    surcharges = air_rates.get("surcharges", {})
-    dim_factor = air_rates.get("dimensional_factor", 6000)
-    
     # Calculate volumetric weight
-    volumetric_weight = cargo_volume_cbm * 1000000 / dim_factor  # CBM to cm³ to kg
+    volumetric_weight = cargo_volume_cbm * 1000000 / surcharges.dim_factor  # CBM to cm³ to kg
     chargeable_weight = max(cargo_weight_kg, volumetric_weight)
     
     # Determine rate tier
@@ -181,10 +268,10 @@ def calculate_air_freight_cost(
     
     # Calculate costs
     base_freight = max(chargeable_weight * rate_per_kg, base_rates.get("min_charge", 80))
-    fuel_surcharge = base_freight * surcharges.get("fuel_surcharge_percent", 25) / 100
-    security_fee = chargeable_weight * surcharges.get("security_surcharge_per_kg", 0.15)
-    awb_fee = surcharges.get("AWB_fee", 30)
-    handling_fee = chargeable_weight * surcharges.get("handling_fee_per_kg", 0.25)
+    fuel_surcharge = base_freight * surcharges.fuel_pct / 100
+    security_fee = chargeable_weight * surcharges.security_per_kg
+    awb_fee = surcharges.awb_fee
+    handling_fee = chargeable_weight * surcharges.handling_per_kg
     
     total_freight = base_freight + fuel_surcharge + security_fee
     total_charges = awb_fee + handling_fee
@@ -253,18 +340,11 @@ def calculate_total_landed_cost(
     total_customs_fees = customs_doc + customs_inspection + customs_handling
     
     # Estimate duties (simplified)
-    duty_rates = {
-        "8471": 0.03,  # Computers
-        "8479": 0.05,  # Machinery
-        "8501": 0.08,  # Motors
-        "8517": 0.02,  # Communication equipment
-    }
-    duty_rate = duty_rates.get(hs_code[:4], 0.05)
+    duty_rate = _DUTY_RATES.get(hs_code[:4], 0.05)
     estimated_duty = cargo_value_usd * duty_rate
     
     # VAT (estimated)
-    vat_rates = {"China": 0.13, "Thailand": 0.07, "USA": 0, "Europe": 0.20}
-    vat_rate = vat_rates.get(destination_country, 0.10)
+    vat_rate = _VAT_RATES.get(destination_country, 0.10)
     vat_base = cargo_value_usd + estimated_duty
     estimated_vat = vat_base * vat_rate
     
@@ -313,6 +393,7 @@ def calculate_total_landed_cost(
     }
 
 
+@cached_tool(maxsize=256)
 def compare_shipping_options(
     origin_country: str,
     destination_country: str,
@@ -334,11 +415,15 @@ def compare_shipping_options(
     Returns:
         dict: Comparison of all available options
     """
+    # Fetch the rate tables once for all options
+    sea_lanes, sea_surcharges = _sea_tables()
+    air_lanes, air_surcharges = _air_tables()
+    
     options = []
     
     # Sea freight LCL
-    sea_lcl = calculate_sea_freight_cost(
-        origin_country, destination_country,
+    sea_lcl = _sea_freight_cost(
+        sea_lanes, sea_surcharges, origin_country, destination_country,
         cargo_weight_kg, cargo_volume_cbm, "LCL"
     )
     if sea_lcl["status"] == "success":
@@ -352,8 +437,8 @@ def compare_shipping_options(
     # Sea freight FCL (if volume warrants)
     if cargo_volume_cbm >= 10:
         container = "20ft" if cargo_volume_cbm <= 25 else "40ft"
-        sea_fcl = calculate_sea_freight_cost(
-            origin_country, destination_country,
+        sea_fcl = _sea_freight_cost(
+            sea_lanes, sea_surcharges, origin_country, destination_country,
             cargo_weight_kg, cargo_volume_cbm, container
         )
         if sea_fcl["status"] == "success":
@@ -365,17 +450,19 @@ def compare_shipping_options(
             })
     
     # Air freight
-    air = calculate_air_freight_cost(
-        origin_country, destination_country,
+    air_option = None
+    air = _air_freight_cost(
+        air_lanes, air_surcharges, origin_country, destination_country,
         cargo_weight_kg, cargo_volume_cbm
     )
     if air["status"] == "success":
-        options.append({
+        air_option = {
             "option": "Air Freight",
             "freight_cost": air["grand_total_usd"],
             "transit_days": "1-3 days",
             "best_for": "Urgent shipments, high-value goods"
-        })
+        }
+        options.append(air_option)
     
     # Sort by cost
     options.sort(key=lambda x: x["freight_cost"])
@@ -383,7 +470,7 @@ def compare_shipping_options(
     # Add recommendation
     if options:
         cheapest = options[0]
-        fastest = min(options, key=lambda x: 1 if "Air" in x["option"] else 10)
+        fastest = air_option or cheapest  # Air is the only 1-3 day option
         
         return {
             "status": "success",
@@ -5,21 +5,53 @@ Document Tools for Logistics Agent
 
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Optional
 
+from ._result_cache import cached_tool
+
+try:
+    from orjson import loads as _json_loads  # Optional: faster parsing
+except ImportError:
+    _json_loads = json.loads
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
+# Incotermごとの責任分担
+_INCOTERM_RESP = MappingProxyType({
+    "EXW": MappingProxyType({"insurance": "Buyer", "freight": "Buyer"}),
+    "FOB": MappingProxyType({"insurance": "Buyer", "freight": "Buyer"}),
+    "CFR": MappingProxyType({"insurance": "Buyer", "freight": "Seller"}),
+    "CIF": MappingProxyType({"insurance": "Seller", "freight": "Seller"}),
+    "DAP": MappingProxyType({"insurance": "Seller", "freight": "Seller"}),
+    "DDP": MappingProxyType({"insurance": "Seller", "freight": "Seller"}),
+})
+_EMPTY = MappingProxyType({})
+
 
+@lru_cache(maxsize=1)
 def load_regulations_data() -> dict:
-    """規制データを読み込む"""
+    """規制データを読み込む（初回のみファイルを読み込み、以降はキャッシュを返す）"""
     reg_file = os.path.join(DATA_DIR, "regulations.json")
     if os.path.exists(reg_file):
-        with open(reg_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(reg_file, "rb") as f:
+            return _json_loads(f.read())
     return {}
 
 
+@lru_cache(maxsize=1)
+def _hs_prefix_index() -> dict:
+    """HSコードの前方一致索引 {prefix: info}（同じprefixはデータ順で最初のコードを優先）"""
+    index = {}
+    for code, info in load_regulations_data().get("hs_codes_common", {}).items():
+        for k in range(len(code) + 1):
+            index.setdefault(code[:k], info)
+    return index
+
+
+@cached_tool(maxsize=256)
 def get_required_documents(
     origin_country: str,
     destination_country: str,
@@ -134,6 +166,7 @@ def get_required_documents(
     }
 
 
+@cached_tool(maxsize=256)
 def check_customs_regulations(
     destination_country: str,
     product_category: str
@@ -186,6 +219,7 @@ def check_customs_regulations(
     }
 
 
+@cached_tool(maxsize=256)
 def get_hs_code_info(hs_code: str) -> dict:
     """
     Get information about an HS code including typical duty rates.
@@ -200,13 +234,8 @@ def get_hs_code_info(hs_code: str) -> dict:
     data = load_regulations_data()
     hs_codes = data.get("hs_codes_common", {})
     
-    # Try exact match first, then prefix match
-    code_info = hs_codes.get(hs_code)
-    if not code_info:
-        for code, info in hs_codes.items():
-            if hs_code.startswith(code) or code.startswith(hs_code[:4]):
-                code_info = info
-                break
+    # Try exact match first, then prefix match (first code starting with the 4-digit heading)
+    code_info = hs_codes.get(hs_code) or _hs_prefix_index().get(hs_code[:4])
     
     if code_info:
         return {
@@ -287,36 +316,41 @@ def generate_shipping_checklist(
 
 def incoterm_responsibility(incoterm: str, item: str) -> str:
     """Determine responsibility based on Incoterm"""
-    responsibilities = {
-        "EXW": {"insurance": "Buyer", "freight": "Buyer"},
-        "FOB": {"insurance": "Buyer", "freight": "Buyer"},
-        "CFR": {"insurance": "Buyer", "freight": "Seller"},
-        "CIF": {"insurance": "Seller", "freight": "Seller"},
-        "DAP": {"insurance": "Seller", "freight": "Seller"},
-        "DDP": {"insurance": "Seller", "freight": "Seller"},
-    }
-    return responsibilities.get(incoterm, {}).get(item, "Check contract")
+    return _INCOTERM_RESP.get(incoterm, _EMPTY).get(item, "Check contract")
+
+
+# Timeline events and day offsets per mode (sea transit: 7 days to China, 14 elsewhere)
+_AIR_EVENTS = (
+    "Booking confirmation",
+    "Cargo pickup and export customs",
+    "Flight departure",
+    "Arrival and import customs",
+    "Delivery to consignee",
+)
+_AIR_OFFSETS = (0, 1, 2, 3, 4)
+_SEA_EVENTS = (
+    "Booking confirmation",
+    "Container stuffing and export customs",
+    "Vessel departure",
+    "Vessel arrival",
+    "Import customs clearance",
+    "Delivery to consignee",
+)
+_SEA_OFFSETS_CHINA = (0, 3, 5, 12, 14, 17)
+_SEA_OFFSETS = (0, 3, 5, 19, 21, 24)
 
 
 def generate_timeline(transport_mode: str, origin: str, destination: str) -> list:
     """Generate estimated timeline"""
-    today = datetime.now()
+    base = date.today().toordinal()
     
     if transport_mode.lower() == "air":
-        return [
-            {"day": 0, "event": "Booking confirmation", "date": today.strftime("%Y-%m-%d")},
-            {"day": 1, "event": "Cargo pickup and export customs", "date": (today + timedelta(days=1)).strftime("%Y-%m-%d")},
-            {"day": 2, "event": "Flight departure", "date": (today + timedelta(days=2)).strftime("%Y-%m-%d")},
-            {"day": 3, "event": "Arrival and import customs", "date": (today + timedelta(days=3)).strftime("%Y-%m-%d")},
-            {"day": 4, "event": "Delivery to consignee", "date": (today + timedelta(days=4)).strftime("%Y-%m-%d")},
-        ]
+        events, offsets = _AIR_EVENTS, _AIR_OFFSETS
     else:
-        transit_days = 7 if "China" in destination else 14
-        return [
-            {"day": 0, "event": "Booking confirmation", "date": today.strftime("%Y-%m-%d")},
-            {"day": 3, "event": "Container stuffing and export customs", "date": (today + timedelta(days=3)).strftime("%Y-%m-%d")},
-            {"day": 5, "event": "Vessel departure", "date": (today + timedelta(days=5)).strftime("%Y-%m-%d")},
-            {"day": 5 + transit_days, "event": "Vessel arrival", "date": (today + timedelta(days=5+transit_days)).strftime("%Y-%m-%d")},
-            {"day": 7 + transit_days, "event": "Import customs clearance", "date": (today + timedelta(days=7+transit_days)).strftime("%Y-%m-%d")},
-            {"day": 10 + transit_days, "event": "Delivery to consignee", "date": (today + timedelta(days=10+transit_days)).strftime("%Y-%m-%d")},
-        ]
+        events = _SEA_EVENTS
+        offsets = _SEA_OFFSETS_CHINA if "China" in destination else _SEA_OFFSETS
+    
+    return [
+        {"day": day, "event": event, "date": date.fromordinal(base + day).isoformat()}
+        for day, event in zip(offsets, events)
+    ]
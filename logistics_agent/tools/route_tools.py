@@ -5,21 +5,86 @@ Route Search Tools for Logistics Agent
 
 import json
 import os
+from functools import lru_cache
 from typing import Optional
 
+try:
+    from orjson import loads as _json_loads  # Optional: faster parsing
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import ijson  # Optional: streaming parse for large route files
+except ImportError:
+    ijson = None
+
 # データファイルのパス
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
+# これより大きい routes.json は索引構築時にストリーム解析する
+STREAM_PARSE_THRESHOLD_BYTES = 1024 * 1024
+
 
+@lru_cache(maxsize=1)
 def load_routes_data() -> dict:
-    """ルートデータを読み込む"""
+    """ルートデータを読み込む（初回のみファイルを読み込み、以降はキャッシュを返す）"""
     routes_file = os.path.join(DATA_DIR, "routes.json")
     if os.path.exists(routes_file):
-        with open(routes_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(routes_file, "rb") as f:
+            return _json_loads(f.read())
     return {"sea_routes": [], "air_routes": [], "truck_routes": []}
 
 
+def _iter_routes(kind: str):
+    """ルートを1件ずつ返す（大きなファイルは ijson で全体を読み込まずに解析）"""
+    routes_file = os.path.join(DATA_DIR, "routes.json")
+    if (
+        ijson is not None
+        and os.path.exists(routes_file)
+        and os.path.getsize(routes_file) > STREAM_PARSE_THRESHOLD_BYTES
+    ):
+        with open(routes_file, "rb") as f:
+            yield from ijson.items(f, f"{kind}.item", use_float=True)
+    else:
+        yield from load_routes_data().get(kind, [])
+
+
+@lru_cache(maxsize=None)
+def _route_index(kind: str, place: str) -> dict:
+    """
+    国ペアごとのルート索引
+    {(origin_country, destination_country): ((view, origin_place, destination_place), ...)}
+    view は検索結果の表示用dict（読み取り専用、carriers は tuple）、国名・港/空港名は小文字化済み
+    （kind: "sea_routes"/"air_routes", place: "port"/"airport"）
+    """
+    index = {}
+    for route in _iter_routes(kind):
+        view = {
+            "route_id": route["id"],
+            "origin": f"{route['origin'][place]} ({route['origin'][place + '_code']})",
+            "destination": f"{route['destination'][place]} ({route['destination'][place + '_code']})",
+            "transit_time_days": route["transit_time_days"],
+            "frequency": route["frequency"],
+            "carriers": tuple(route["carriers"]),
+            "route_type": route["route_type"]
+        }
+        if kind == "sea_routes":
+            view["via"] = route.get("via", "Direct")
+        
+        key = (route["origin"]["country"].strip().lower(), route["destination"]["country"].strip().lower())
+        entry = (view, route["origin"][place].lower(), route["destination"][place].lower())
+        index.setdefault(key, []).append(entry)
+    return {key: tuple(entries) for key, entries in index.items()}
+
+
+def _first_route_transit(kind: str, place: str, origin_country: str, destination_country: str) -> Optional[int]:
+    """国ペアの最初のルートの所要日数（ルートがなければ None）"""
+    candidates = _route_index(kind, place).get(
+        (origin_country.strip().lower(), destination_country.strip().lower())
+    )
+    return candidates[0][0]["transit_time_days"] if candidates else None
+
+
 def search_sea_routes(
     origin_country: str,
     destination_country: str,
@@ -39,30 +104,21 @@ def search_sea_routes(
     Returns:
         dict: Available sea routes with transit times and carriers
     """
-    data = load_routes_data()
+    candidates = _route_index("sea_routes", "port").get(
+        (origin_country.strip().lower(), destination_country.strip().lower()), ()
+    )
+    origin_port = origin_port.lower() if origin_port else None
+    destination_port = destination_port.lower() if destination_port else None
     routes = []
     
-    for route in data.get("sea_routes", []):
-        origin_match = route["origin"]["country"].lower() == origin_country.lower()
-        dest_match = route["destination"]["country"].lower() == destination_country.lower()
+    for view, origin_port_lc, destination_port_lc in candidates:
+        # Check specific ports if provided
+        if origin_port and origin_port not in origin_port_lc:
+            continue
+        if destination_port and destination_port not in destination_port_lc:
+            continue
         
-        if origin_match and dest_match:
-            # Check specific ports if provided
-            if origin_port and origin_port.lower() not in route["origin"]["port"].lower():
-                continue
-            if destination_port and destination_port.lower() not in route["destination"]["port"].lower():
-                continue
-            
-            routes.append({
-                "route_id": route["id"],
-                "origin": f"{route['origin']['port']} ({route['origin']['port_code']})",
-                "destination": f"{route['destination']['port']} ({route['destination']['port_code']})",
-                "transit_time_days": route["transit_time_days"],
-                "frequency": route["frequency"],
-                "carriers": route["carriers"],
-                "route_type": route["route_type"],
-                "via": route.get("via", "Direct")
-            })
+        routes.append({**view, "carriers": list(view["carriers"])})
     
     if routes:
         return {
@@ -98,28 +154,20 @@ def search_air_routes(
     Returns:
         dict: Available air routes with transit times and carriers
     """
-    data = load_routes_data()
+    candidates = _route_index("air_routes", "airport").get(
+        (origin_country.strip().lower(), destination_country.strip().lower()), ()
+    )
+    origin_airport = origin_airport.lower() if origin_airport else None
+    destination_airport = destination_airport.lower() if destination_airport else None
     routes = []
     
-    for route in data.get("air_routes", []):
-        origin_match = route["origin"]["country"].lower() == origin_country.lower()
-        dest_match = route["destination"]["country"].lower() == destination_country.lower()
+    for view, origin_airport_lc, destination_airport_lc in candidates:
+        if origin_airport and origin_airport not in origin_airport_lc:
+            continue
+        if destination_airport and destination_airport not in destination_airport_lc:
+            continue
         
-        if origin_match and dest_match:
-            if origin_airport and origin_airport.lower() not in route["origin"]["airport"].lower():
-                continue
-            if destination_airport and destination_airport.lower() not in route["destination"]["airport"].lower():
-                continue
-            
-            routes.append({
-                "route_id": route["id"],
-                "origin": f"{route['origin']['airport']} ({route['origin']['airport_code']})",
-                "destination": f"{route['destination']['airport']} ({route['destination']['airport_code']})",
-                "transit_time_days": route["transit_time_days"],
-                "frequency": route["frequency"],
-                "carriers": route["carriers"],
-                "route_type": route["route_type"]
-            })
+        routes.append({**view, "carriers": list(view["carriers"])})
     
     if routes:
         return {
@@ -157,16 +205,14 @@ def recommend_transport_mode(
     Returns:
         dict: Recommended transport mode with reasoning
     """
-    # Search available routes
-    sea_routes = search_sea_routes(origin_country, destination_country)
-    air_routes = search_air_routes(origin_country, destination_country)
+    # Look up transit times of the first available routes
+    sea_transit = _first_route_transit("sea_routes", "port", origin_country, destination_country)
+    air_transit = _first_route_transit("air_routes", "airport", origin_country, destination_country)
     
     recommendations = []
     
     # Air freight logic
-    if air_routes["status"] == "success":
-        air_transit = air_routes["routes"][0]["transit_time_days"]
-        
+    if air_transit is not None:
         if urgency == "urgent":
             recommendations.append({
                 "mode": "Air Freight",
@@ -185,9 +231,7 @@ def recommend_transport_mode(
             })
     
     # Sea freight logic
-    if sea_routes["status"] == "success":
-        sea_transit = sea_routes["routes"][0]["transit_time_days"]
-        
+    if sea_transit is not None:
         if urgency == "economy" or cargo_weight_kg > 500:
             recommendations.append({
                 "mode": "Sea Freight (FCL)" if cargo_volume_cbm >= 15 else "Sea Freight (LCL)",
@@ -1,22 +1,23 @@
 import asyncio
+from datetime import datetime, timedelta, timezone
 from google.adk.agents import Agent
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+# 都市ごとのタイムゾーン（固定オフセット、未登録の都市はUTC）
+_TZ_BY_CITY = {
+    city: timezone(timedelta(hours=offset))
+    for city, offset in {
+        "tokyo": 9, "new york": -5, "london": 0,
+        "paris": 1, "los angeles": -8
+    }.items()
+}
+
 # Tool implementation
 def get_current_time(city: str) -> dict:
     """Returns the current time in a specified city."""
-    import datetime
-    
-    tz_offsets = {
-        "tokyo": 9, "new york": -5, "london": 0, 
-        "paris": 1, "los angeles": -8
-    }
-    
-    offset = tz_offsets.get(city.lower(), 0)
-    utc_now = datetime.datetime.utcnow()
-    local_time = utc_now + datetime.timedelta(hours=offset)
+    local_time = datetime.now(_TZ_BY_CITY.get(city.lower(), timezone.utc))
     
     return {
         "status": "success", 
@@ -32,31 +33,31 @@ root_agent = Agent(
     tools=[get_current_time],
 )
 
+APP_NAME = "my_agent"
+USER_ID = "user1"
+
+# 全クエリで共有するセッションサービスとRunner
+_SESSION_SERVICE = InMemorySessionService()
+_RUNNER = Runner(
+    agent=root_agent,
+    app_name=APP_NAME,
+    session_service=_SESSION_SERVICE
+)
+
 # エージェントを実行する関数
 async def run_agent(user_input: str):
-    APP_NAME = "my_agent"
-    USER_ID = "user1"
-    
-    session_service = InMemorySessionService()
-    
     # await を追加
-    session = await session_service.create_session(
+    session = await _SESSION_SERVICE.create_session(
         app_name=APP_NAME,
         user_id=USER_ID
     )
     
-    runner = Runner(
-        agent=root_agent,
-        app_name=APP_NAME,
-        session_service=session_service
-    )
-    
     content = types.Content(
         role="user",
         parts=[types.Part(text=user_input)]
     )
     
-    async for event in runner.run_async(
+    async for event in _RUNNER.run_async(
         user_id=USER_ID,
         session_id=session.id,
         new_message=content
@@ -1,5 +1,7 @@
 import asyncio
 import os
+from itertools import islice
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +11,36 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+# ===========================================
+# シミュレートされたデータ（モジュール定数、読み取り専用）
+# ===========================================
+
+# 天気データ
+_WEATHER_DATA = MappingProxyType({
+    "tokyo": {"temp_c": 22, "condition": "sunny"},
+    "new york": {"temp_c": 18, "condition": "cloudy"},
+    "london": {"temp_c": 15, "condition": "rainy"},
+    "paris": {"temp_c": 20, "condition": "partly cloudy"},
+})
+
+# 配送料金（キーが有効な配送方法）
+_BASE_RATES = MappingProxyType({"standard": 5, "express": 15, "overnight": 30})
+_COUNTRY_MULT = MappingProxyType({"US": 1.0, "JP": 1.5, "UK": 1.2, "DE": 1.3})
+_DELIVERY_DAYS = MappingProxyType({"standard": "5-7", "express": "2-3", "overnight": "1"})
+
+# 商品データ（検索用に小文字化した商品名と組にしておく）
+_PRODUCTS = tuple(
+    (p, p["name"].lower())
+    for p in (
+        {"id": 1, "name": "Laptop", "price": 999, "category": "Electronics"},
+        {"id": 2, "name": "Headphones", "price": 199, "category": "Electronics"},
+        {"id": 3, "name": "Coffee Maker", "price": 79, "category": "Kitchen"},
+        {"id": 4, "name": "Running Shoes", "price": 129, "category": "Sports"},
+        {"id": 5, "name": "Book: AI Fundamentals", "price": 49, "category": "Books"},
+    )
+)
+
+
 # ===========================================
 # ベストプラクティス 1: 明確で詳細なDocstring
 # ===========================================
@@ -29,23 +61,14 @@ def get_weather(city: str, unit: str = "celsius") -> dict:
             - unit: The temperature unit used
             - condition: Weather condition (e.g., "sunny", "cloudy", "rainy")
     """
-    # シミュレートされた天気データ
-    weather_data = {
-        "tokyo": {"temp_c": 22, "condition": "sunny"},
-        "new york": {"temp_c": 18, "condition": "cloudy"},
-        "london": {"temp_c": 15, "condition": "rainy"},
-        "paris": {"temp_c": 20, "condition": "partly cloudy"},
-    }
-    
-    city_lower = city.lower()
+    data = _WEATHER_DATA.get(city.lower())
     
-    if city_lower not in weather_data:
+    if data is None:
         return {
             "status": "error",
             "error_message": f"Weather data not available for '{city}'. Available cities: Tokyo, New York, London, Paris"
         }
     
-    data = weather_data[city_lower]
     temp = data["temp_c"]
     
     if unit.lower() == "fahrenheit":
@@ -88,17 +111,9 @@ def search_products(query: str, max_results: int = 5) -> dict:
             "error_message": "max_results must be between 1 and 10"
         }
     
-    # シミュレートされた商品データ
-    products = [
-        {"id": 1, "name": "Laptop", "price": 999, "category": "Electronics"},
-        {"id": 2, "name": "Headphones", "price": 199, "category": "Electronics"},
-        {"id": 3, "name": "Coffee Maker", "price": 79, "category": "Kitchen"},
-        {"id": 4, "name": "Running Shoes", "price": 129, "category": "Sports"},
-        {"id": 5, "name": "Book: AI Fundamentals", "price": 49, "category": "Books"},
-    ]
-    
-    # 簡易検索
-    results = [p for p in products if query.lower() in p["name"].lower()][:max_results]
+    # 簡易検索（max_results 件見つかった時点で打ち切り、返す商品はコピー）
+    q = query.lower()
+    results = [dict(p) for p in islice((p for p, name_lower in _PRODUCTS if q in name_lower), max_results)]
     
     return {
         "status": "success",
@@ -132,30 +147,26 @@ def calculate_shipping(
     if weight_kg <= 0:
         return {"status": "error", "error_message": "Weight must be positive"}
     
-    valid_methods = ["standard", "express", "overnight"]
-    if shipping_method.lower() not in valid_methods:
+    method = shipping_method.lower()
+    base = _BASE_RATES.get(method)
+    if base is None:
         return {
             "status": "error",
-            "error_message": f"Invalid shipping method. Choose from: {valid_methods}"
+            "error_message": f"Invalid shipping method. Choose from: {list(_BASE_RATES)}"
         }
     
     # 料金計算（シミュレート）
-    base_rates = {"standard": 5, "express": 15, "overnight": 30}
-    country_multipliers = {"US": 1.0, "JP": 1.5, "UK": 1.2, "DE": 1.3}
-    
-    multiplier = country_multipliers.get(destination_country.upper(), 2.0)
-    base = base_rates[shipping_method.lower()]
+    destination = destination_country.upper()
+    multiplier = _COUNTRY_MULT.get(destination, 2.0)
     cost = round((base + weight_kg * 2) * multiplier, 2)
     
-    delivery_days = {"standard": "5-7", "express": "2-3", "overnight": "1"}
-    
     return {
         "status": "success",
         "weight_kg": weight_kg,
-        "destination": destination_country.upper(),
+        "destination": destination,
         "method": shipping_method,
         "cost_usd": cost,
-        "estimated_delivery_days": delivery_days[shipping_method.lower()]
+        "estimated_delivery_days": _DELIVERY_DAYS[method]
     }
 
 
@@ -183,41 +194,50 @@ If a tool returns an error, explain it to the user in a friendly way.
 # 実行関数
 # ===========================================
 
-async def chat_with_agent(user_input: str):
-    """エージェントと対話する関数"""
-    APP_NAME = "shopping_app"
-    USER_ID = "user1"
-    
-    session_service = InMemorySessionService()
-    session = await session_service.create_session(
+APP_NAME = "shopping_app"
+USER_ID = "user1"
+
+# 全クエリで共有するセッションサービスとRunner
+_SESSION_SERVICE = InMemorySessionService()
+_RUNNER = Runner(
+    agent=shopping_agent,
+    app_name=APP_NAME,
+    session_service=_SESSION_SERVICE
+)
+
+
+def _print_exchange(user_input: str, response_text: str):
+    """質問と回答を表示"""
+    print(f"\n🛒 質問: {user_input}")
+    print("-" * 50)
+    print(f"🤖 回答: {response_text}")
+
+
+async def chat_with_agent(user_input: str, echo: bool = True):
+    """エージェントと対話する関数（echo=False の場合は表示せず回答だけを返す）"""
+    session = await _SESSION_SERVICE.create_session(
         app_name=APP_NAME,
         user_id=USER_ID
     )
     
-    runner = Runner(
-        agent=shopping_agent,
-        app_name=APP_NAME,
-        session_service=session_service
-    )
-    
     content = types.Content(
         role="user",
         parts=[types.Part(text=user_input)]
     )
     
-    print(f"\n🛒 質問: {user_input}")
-    print("-" * 50)
-    
-    async for event in runner.run_async(
+    response_text = "No response"
+    async for event in _RUNNER.run_async(
         user_id=USER_ID,
         session_id=session.id,
         new_message=content
     ):
         if event.is_final_response():
-            print(f"🤖 回答: {event.content.parts[0].text}")
-            return event.content.parts[0].text
+            response_text = event.content.parts[0].text
+            break
     
-    return "No response"
+    if echo:
+        _print_exchange(user_input, response_text)
+    return response_text
 
 
 # ===========================================
@@ -242,10 +262,22 @@ async def main():
         "What's the weather in Tokyo and can you find me some headphones?",
     ]
     
-    for query in test_queries:
-        await chat_with_agent(query)
+    # 各クエリは独立したセッションなので並行実行し、結果は順番に表示
+    responses = await asyncio.gather(
+        *(chat_with_agent(query, echo=False) for query in test_queries)
+    )
+    
+    for query, response_text in zip(test_queries, responses):
+        _print_exchange(query, response_text)
         print("\n" + "=" * 60)
 
 
 if __name__ == "__main__":
+    # uvloop is optional (Linux/macOS); the default asyncio loop is used without it
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     asyncio.run(main())
\ No newline at end of file
@@ -13,6 +13,8 @@ Day 3: Context Engineering - Sessions & Memory
 
 import asyncio
 import os
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -24,12 +26,46 @@ from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 
+# ===========================================
+# 上限付きLRUストア
+# ===========================================
+
+class LRUStore(OrderedDict):
+    """上限件数付きのストア（アクセスしたキーを最新にし、上限を超えたら最も古いキーを追い出す）"""
+    
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+    
+    def lookup(self, key):
+        """値を取得して最新としてマーク（なければ None）"""
+        value = self.get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+    
+    def get_or_create(self, key, factory=dict):
+        """値を取得（なければ factory() で作成し、上限を超えた分を追い出す）"""
+        value = self.lookup(key)
+        if value is None:
+            value = self[key] = factory()
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+        return value
+
+
 # ===========================================
 # ユーザーメモリ（長期記憶のシミュレーション）
 # ===========================================
 
 # 実際のアプリではデータベースに保存
-user_memory = {}
+MAX_USERS = 1000
+user_memory = LRUStore(MAX_USERS)
+
+def _format_ns(timestamp_ns: int) -> str:
+    """time.time_ns() の値を ISO 形式の文字列に変換（表示時のみ整形）"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
 
 def save_user_preference(user_id: str, key: str, value: str) -> dict:
     """
@@ -43,12 +79,9 @@ def save_user_preference(user_id: str, key: str, value: str) -> dict:
     Returns:
         dict: Confirmation of saved preference
     """
-    if user_id not in user_memory:
-        user_memory[user_id] = {}
-    
-    user_memory[user_id][key] = {
+    user_memory.get_or_create(user_id)[key] = {
         "value": value,
-        "saved_at": datetime.now().isoformat()
+        "saved_at_ns": time.time_ns()
     }
     
     return {
@@ -68,24 +101,25 @@ def get_user_preference(user_id: str, key: str) -> dict:
     Returns:
         dict: The stored preference or error if not found
     """
-    if user_id not in user_memory:
+    prefs = user_memory.lookup(user_id)
+    if prefs is None:
         return {
             "status": "not_found",
             "message": f"No preferences found for user {user_id}"
         }
     
-    if key not in user_memory[user_id]:
+    pref = prefs.get(key)
+    if pref is None:
         return {
             "status": "not_found", 
             "message": f"Preference '{key}' not found for user {user_id}"
         }
     
-    pref = user_memory[user_id][key]
     return {
         "status": "success",
         "key": key,
         "value": pref["value"],
-        "saved_at": pref["saved_at"]
+        "saved_at": _format_ns(pref["saved_at_ns"])
     }
 
 
@@ -99,7 +133,8 @@ def get_all_user_preferences(user_id: str) -> dict:
     Returns:
         dict: All stored preferences for the user
     """
-    if user_id not in user_memory or not user_memory[user_id]:
+    prefs = user_memory.lookup(user_id)
+    if not prefs:
         return {
             "status": "empty",
             "message": f"No preferences stored for user {user_id}",
@@ -109,7 +144,7 @@ def get_all_user_preferences(user_id: str) -> dict:
     return {
         "status": "success",
         "user_id": user_id,
-        "preferences": {k: v["value"] for k, v in user_memory[user_id].items()}
+        "preferences": {k: v["value"] for k, v in prefs.items()}
     }
 
 
@@ -117,8 +152,9 @@ def get_all_user_preferences(user_id: str) -> dict:
 # タスク管理ツール（セッション状態のデモ）
 # ===========================================
 
-# セッションごとのタスクリスト
-session_tasks = {}
+# セッションごとのタスク {task_id: task}
+MAX_SESSIONS = 1000
+session_tasks = LRUStore(MAX_SESSIONS)
 
 def add_task(session_id: str, task: str, priority: str = "medium") -> dict:
     """
@@ -132,18 +168,18 @@ def add_task(session_id: str, task: str, priority: str = "medium") -> dict:
     Returns:
         dict: Confirmation with task details
     """
-    if session_id not in session_tasks:
-        session_tasks[session_id] = []
+    tasks = session_tasks.get_or_create(session_id)
+    task_id = len(tasks) + 1
     
     task_item = {
-        "id": len(session_tasks[session_id]) + 1,
+        "id": task_id,
         "task": task,
         "priority": priority,
         "status": "pending",
-        "created_at": datetime.now().isoformat()
+        "created_at_ns": time.time_ns()
     }
     
-    session_tasks[session_id].append(task_item)
+    tasks[task_id] = task_item
     
     return {
         "status": "success",
@@ -152,6 +188,13 @@ def add_task(session_id: str, task: str, priority: str = "medium") -> dict:
     }
 
 
+def _task_view(task: dict) -> dict:
+    """表示用のタスク（作成時刻を ISO 形式に整形したコピー）"""
+    view = dict(task)
+    view["created_at"] = _format_ns(view.pop("created_at_ns"))
+    return view
+
+
 def get_tasks(session_id: str) -> dict:
     """
     Get all tasks for the current session.
@@ -162,7 +205,8 @@ def get_tasks(session_id: str) -> dict:
     Returns:
         dict: List of all tasks in the session
     """
-    if session_id not in session_tasks or not session_tasks[session_id]:
+    tasks = session_tasks.lookup(session_id)
+    if not tasks:
         return {
             "status": "empty",
             "message": "No tasks in this session",
@@ -171,8 +215,8 @@ def get_tasks(session_id: str) -> dict:
     
     return {
         "status": "success",
-        "total_tasks": len(session_tasks[session_id]),
-        "tasks": session_tasks[session_id]
+        "total_tasks": len(tasks),
+        "tasks": [_task_view(task) for task in tasks.values()]
     }
 
 
@@ -187,18 +231,19 @@ def complete_task(session_id: str, task_id: int) -> dict:
     Returns:
         dict: Confirmation of task completion
     """
-    if session_id not in session_tasks:
+    tasks = session_tasks.lookup(session_id)
+    if tasks is None:
         return {"status": "error", "message": "No tasks found in this session"}
     
-    for task in session_tasks[session_id]:
-        if task["id"] == task_id:
-            task["status"] = "completed"
-            return {
-                "status": "success",
-                "message": f"Task {task_id} marked as completed"
-            }
+    task = tasks.get(task_id)
+    if task is None:
+        return {"status": "error", "message": f"Task {task_id} not found"}
     
-    return {"status": "error", "message": f"Task {task_id} not found"}
+    task["status"] = "completed"
+    return {
+        "status": "success",
+        "message": f"Task {task_id} marked as completed"
+    }
 
 
 # ===========================================
@@ -239,15 +284,40 @@ The user_id is always "user1" and session_id is provided in each interaction.
 # 会話クラス（複数ターン対応）
 # ===========================================
 
+# 全セッションで共有するセッションサービスとRunner
+APP_NAME = "memory_app"
+_SESSION_SERVICE = InMemorySessionService()
+_RUNNER = Runner(
+    agent=memory_agent,
+    app_name=APP_NAME,
+    session_service=_SESSION_SERVICE
+)
+
+
 class ConversationSession:
     """複数ターンの会話を管理するクラス"""
     
-    def __init__(self, user_id: str = "user1"):
+    def __init__(self, user_id: str = "user1", echo: bool = True):
         self.user_id = user_id
-        self.app_name = "memory_app"
-        self.session_service = InMemorySessionService()
+        self.app_name = APP_NAME
+        self.session_service = _SESSION_SERVICE
         self.session = None
-        self.runner = None
+        self.runner = _RUNNER
+        self.echo = echo
+        self.transcript = []
+    
+    def _print(self, text: str):
+        """出力（echo=False の場合は transcript に溜めて flush で表示）"""
+        if self.echo:
+            print(text)
+        else:
+            self.transcript.append(text)
+    
+    def flush(self):
+        """溜めた出力をまとめて表示"""
+        for text in self.transcript:
+            print(text)
+        self.transcript.clear()
     
     async def start(self):
         """セッションを開始"""
@@ -256,13 +326,7 @@ class ConversationSession:
             user_id=self.user_id
         )
         
-        self.runner = Runner(
-            agent=memory_agent,
-            app_name=self.app_name,
-            session_service=self.session_service
-        )
-        
-        print(f"📝 セッション開始: {self.session.id[:8]}...")
+        self._print(f"📝 セッション開始: {self.session.id[:8]}...")
         return self.session.id
     
     async def chat(self, message: str) -> str:
@@ -272,7 +336,7 @@ class ConversationSession:
             parts=[types.Part(text=message)]
         )
         
-        print(f"\n👤 You: {message}")
+        self._print(f"\n👤 You: {message}")
         
         response_text = ""
         async for event in self.runner.run_async(
@@ -282,7 +346,7 @@ class ConversationSession:
         ):
             if event.is_final_response():
                 response_text = event.content.parts[0].text
-                print(f"🤖 Assistant: {response_text}")
+                self._print(f"🤖 Assistant: {response_text}")
         
         return response_text
 
@@ -303,53 +367,60 @@ async def demo_session_memory():
         print("❌ エラー: GOOGLE_API_KEY が設定されていません")
         return
     
+    # デモ 1〜3 は別々のセッションなので並行実行し、出力は各デモごとにまとめて表示
+    # （セッション内のターンは順番に実行）
+    
     # ===========================================
     # デモ 1: 短期記憶（セッション内の会話履歴）
     # ===========================================
     
-    print("\n" + "=" * 70)
-    print("📌 デモ 1: セッション内の会話履歴（短期記憶）")
-    print("=" * 70)
-    
-    session1 = ConversationSession()
-    await session1.start()
-    
-    # 複数ターンの会話 - エージェントは前の発言を覚えている
-    await session1.chat("Hi! My name is Taro and I'm from Tokyo.")
-    await session1.chat("What's my name and where am I from?")  # 前の発言を参照
+    async def demo1(session: ConversationSession):
+        await session.start()
+        
+        # 複数ターンの会話 - エージェントは前の発言を覚えている
+        await session.chat("Hi! My name is Taro and I'm from Tokyo.")
+        await session.chat("What's my name and where am I from?")  # 前の発言を参照
     
     # ===========================================
     # デモ 2: 長期記憶（ユーザー設定の保存）
     # ===========================================
     
-    print("\n" + "=" * 70)
-    print("📌 デモ 2: 長期記憶（ユーザー設定の保存）")
-    print("=" * 70)
-    
-    session2 = ConversationSession()
-    await session2.start()
-    
-    await session2.chat("Please remember that my favorite color is blue and I prefer Japanese language.")
-    await session2.chat("What are my saved preferences?")
+    async def demo2(session: ConversationSession):
+        await session.start()
+        
+        await session.chat("Please remember that my favorite color is blue and I prefer Japanese language.")
+        await session.chat("What are my saved preferences?")
     
     # ===========================================
     # デモ 3: タスク管理（セッション状態）
     # ===========================================
     
-    print("\n" + "=" * 70)
-    print("📌 デモ 3: タスク管理（セッション状態）")
-    print("=" * 70)
-    
-    session3 = ConversationSession()
-    session_id = await session3.start()
-    
-    # セッションIDをツールで使えるように
-    await session3.chat(f"Add a high priority task: Finish the AI course. My session ID is {session_id}")
-    await session3.chat(f"Add another task: Review Day 3 materials. Session ID: {session_id}")
-    await session3.chat(f"Show me all my tasks. Session ID: {session_id}")
+    async def demo3(session: ConversationSession):
+        session_id = await session.start()
+        
+        # セッションIDをツールで使えるように
+        await session.chat(f"Add a high priority task: Finish the AI course. My session ID is {session_id}")
+        await session.chat(f"Add another task: Review Day 3 materials. Session ID: {session_id}")
+        await session.chat(f"Show me all my tasks. Session ID: {session_id}")
+    
+    session1 = ConversationSession(echo=False)
+    session2 = ConversationSession(echo=False)
+    session3 = ConversationSession(echo=False)
+    await asyncio.gather(demo1(session1), demo2(session2), demo3(session3))
+    
+    for title, session in (
+        ("📌 デモ 1: セッション内の会話履歴（短期記憶）", session1),
+        ("📌 デモ 2: 長期記憶（ユーザー設定の保存）", session2),
+        ("📌 デモ 3: タスク管理（セッション状態）", session3),
+    ):
+        print("\n" + "=" * 70)
+        print(title)
+        print("=" * 70)
+        session.flush()
     
     # ===========================================
     # デモ 4: 新しいセッションでも長期記憶は保持
+    # （デモ 2 で保存した設定を使うため、並行実行の後に実行）
     # ===========================================
     
     print("\n" + "=" * 70)
@@ -377,7 +448,7 @@ async def demo_session_memory():
     print(f"\nセッションタスク（session_tasks）:")
     for sid, tasks in session_tasks.items():
         print(f"  Session: {sid[:8]}...")
-        for task in tasks:
+        for task in tasks.values():
             print(f"    - [{task['status']}] {task['task']} ({task['priority']})")
 
 
@@ -431,6 +502,13 @@ async def interactive_mode():
 # ===========================================
 
 if __name__ == "__main__":
+    # uvloop is optional (Linux/macOS); the default asyncio loop is used without it
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "--interactive":
@@ -14,9 +14,15 @@ Observability（可観測性）の3つの柱:
 """
 
 import asyncio
+import inspect
+import math
 import os
 import logging
+import threading
 import time
+import weakref
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from datetime import datetime
 from functools import wraps
 from typing import Callable, Any
@@ -29,6 +35,11 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+try:
+    from hdrh.histogram import HdrHistogram  # Optional: 全リクエストの応答時間パーセンタイル
+except ImportError:
+    HdrHistogram = None
+
 
 # ===========================================
 # 1. ロギングの設定
@@ -54,6 +65,22 @@ adk_logger.setLevel(logging.WARNING)  # INFO or DEBUG for more details
 # 2. メトリクス収集クラス
 # ===========================================
 
+# 保持する直近の応答時間の件数
+RECENT_RESPONSE_TIMES = 1024
+
+# 表示する応答時間のパーセンタイル
+RESPONSE_TIME_PERCENTILES = (50, 95, 99)
+
+# HdrHistogram の記録範囲（マイクロ秒、1µs〜60秒、有効数字3桁）
+_HISTOGRAM_MAX_US = 60_000_000
+
+
+@dataclass(slots=True)
+class ToolStats:
+    """ツールごとの呼び出し統計（平均は読み出し時に計算）"""
+    count: int = 0
+    total_time: float = 0.0
+
 class MetricsCollector:
     """エージェントのメトリクスを収集するクラス"""
     
@@ -62,58 +89,91 @@ class MetricsCollector:
             "total_requests": 0,
             "successful_requests": 0,
             "failed_requests": 0,
-            "tool_calls": {},
-            "response_times": [],
+            "tool_calls": defaultdict(ToolStats),
+            "response_times": deque(maxlen=RECENT_RESPONSE_TIMES),  # 直近の応答時間のみ保持
             "errors": []
         }
         self.start_time = datetime.now()
+        
+        # 応答時間の累計統計（全リクエスト分を O(1) で更新）
+        self._response_time_sum = 0.0
+        self._response_time_min = float("inf")
+        self._response_time_max = float("-inf")
+        self._histogram = HdrHistogram(1, _HISTOGRAM_MAX_US, 3) if HdrHistogram else None
+        
+        # 別スレッド（ワーカースレッドで動くツールなど）からの記録に備えて更新・読み出しをロックで保護
+        self._lock = threading.Lock()
     
     def record_request(self, success: bool, duration: float, error: str = None):
         """リクエストを記録"""
-        self.metrics["total_requests"] += 1
-        self.metrics["response_times"].append(duration)
-        
-        if success:
-            self.metrics["successful_requests"] += 1
-        else:
-            self.metrics["failed_requests"] += 1
-            if error:
-                self.metrics["errors"].append({
-                    "time": datetime.now().isoformat(),
-                    "error": error
-                })
+        with self._lock:
+            self.metrics["total_requests"] += 1
+            self.metrics["response_times"].append(duration)
+            self._response_time_sum += duration
+            self._response_time_min = min(self._response_time_min, duration)
+            self._response_time_max = max(self._response_time_max, duration)
+            if self._histogram is not None:
+                self._histogram.record_value(min(max(int(duration * 1e6), 1), _HISTOGRAM_MAX_US))
+            
+            if success:
+                self.metrics["successful_requests"] += 1
+            else:
+                self.metrics["failed_requests"] += 1
+                if error:
+                    self.metrics["errors"].append({
+                        "time": datetime.now().isoformat(),
+                        "error": error
+                    })
     
     def record_tool_call(self, tool_name: str, duration: float):
         """ツール呼び出しを記録"""
-        if tool_name not in self.metrics["tool_calls"]:
-            self.metrics["tool_calls"][tool_name] = {
-                "count": 0,
-                "total_time": 0,
-                "avg_time": 0
-            }
-        
-        self.metrics["tool_calls"][tool_name]["count"] += 1
-        self.metrics["tool_calls"][tool_name]["total_time"] += duration
-        self.metrics["tool_calls"][tool_name]["avg_time"] = (
-            self.metrics["tool_calls"][tool_name]["total_time"] / 
-            self.metrics["tool_calls"][tool_name]["count"]
-        )
+        with self._lock:
+            stats = self.metrics["tool_calls"][tool_name]
+            stats.count += 1
+            stats.total_time += duration
     
     def get_summary(self) -> dict:
         """メトリクスのサマリーを取得"""
-        response_times = self.metrics["response_times"]
+        with self._lock:
+            return self._build_summary()
+    
+    def _response_time_percentiles(self) -> dict:
+        """応答時間のパーセンタイル（hdrh があれば全リクエスト、なければ直近のサンプルから計算）"""
+        if self._histogram is not None:
+            return {
+                p: self._histogram.get_value_at_percentile(p) / 1e6
+                for p in RESPONSE_TIME_PERCENTILES
+            }
+        
+        samples = sorted(self.metrics["response_times"])
+        return {
+            p: samples[max(math.ceil(len(samples) * p / 100) - 1, 0)]
+            for p in RESPONSE_TIME_PERCENTILES
+        }
+    
+    def _build_summary(self) -> dict:
+        """サマリーを作成（ロックを取得した状態で呼ぶ）"""
+        total_requests = self.metrics["total_requests"]
         
         return {
             "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
-            "total_requests": self.metrics["total_requests"],
+            "total_requests": total_requests,
             "success_rate": (
-                self.metrics["successful_requests"] / self.metrics["total_requests"] * 100
-                if self.metrics["total_requests"] > 0 else 0
+                self.metrics["successful_requests"] / total_requests * 100
+                if total_requests > 0 else 0
             ),
-            "avg_response_time": sum(response_times) / len(response_times) if response_times else 0,
-            "min_response_time": min(response_times) if response_times else 0,
-            "max_response_time": max(response_times) if response_times else 0,
-            "tool_calls": self.metrics["tool_calls"],
+            "avg_response_time": self._response_time_sum / total_requests if total_requests else 0,
+            "min_response_time": self._response_time_min if total_requests else 0,
+            "max_response_time": self._response_time_max if total_requests else 0,
+            "response_time_percentiles": self._response_time_percentiles() if total_requests else {},
+            "tool_calls": {
+                name: {
+                    "count": stats.count,
+                    "total_time": stats.total_time,
+                    "avg_time": stats.total_time / stats.count
+                }
+                for name, stats in self.metrics["tool_calls"].items()
+            },
             "recent_errors": self.metrics["errors"][-5:]  # 最新5件のエラー
         }
     
@@ -130,6 +190,8 @@ class MetricsCollector:
         print(f"  Avg Response Time: {summary['avg_response_time']:.3f}s")
         print(f"  Min Response Time: {summary['min_response_time']:.3f}s")
         print(f"  Max Response Time: {summary['max_response_time']:.3f}s")
+        for p, value in summary["response_time_percentiles"].items():
+            print(f"  P{p} Response Time: {value:.3f}s")
         
         if summary["tool_calls"]:
             print("\n  📦 Tool Calls:")
@@ -152,25 +214,53 @@ metrics = MetricsCollector()
 # 3. トレーシングデコレーター
 # ===========================================
 
+# 同時に実行するツール呼び出しの上限（同じステップの複数ツール呼び出しは並行実行）
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4"))
+_tool_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_tool_semaphore() -> asyncio.Semaphore:
+    """実行中のイベントループ用のセマフォを取得（asyncio.run ごとにループが変わるため）"""
+    loop = asyncio.get_running_loop()
+    semaphore = _tool_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _tool_semaphores[loop] = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+    return semaphore
+
+
 def trace_tool(func: Callable) -> Callable:
-    """ツール関数にトレーシングを追加するデコレーター"""
+    """
+    ツール関数にトレーシングを追加するデコレーター
+    
+    ラッパーは async 関数になる。同期関数はスレッドで実行し、
+    time.sleep などの待ち時間でイベントループを止めないようにする。
+    同時実行数は TOOL_CONCURRENCY_LIMIT までに制限する。
+    """
+    is_async = inspect.iscoroutinefunction(func)
     
     @wraps(func)
-    def wrapper(*args, **kwargs) -> Any:
+    async def wrapper(*args, **kwargs) -> Any:
+        async with _get_tool_semaphore():
+            return await _run_traced(*args, **kwargs)
+    
+    async def _run_traced(*args, **kwargs) -> Any:
         tool_name = func.__name__
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # 開始ログ
-        logger.debug(f"🔧 TOOL START: {tool_name}")
-        logger.debug(f"   Args: {args}, Kwargs: {kwargs}")
+        logger.debug("🔧 TOOL START: %s", tool_name)
+        logger.debug("   Args: %s, Kwargs: %s", args, kwargs)
         
         try:
-            result = func(*args, **kwargs)
-            duration = time.time() - start_time
+            if is_async:
+                result = await func(*args, **kwargs)
+            else:
+                result = await asyncio.to_thread(func, *args, **kwargs)
+            duration = time.perf_counter() - start_time
             
             # 成功ログ
-            logger.info(f"✅ TOOL SUCCESS: {tool_name} ({duration:.3f}s)")
-            logger.debug(f"   Result: {result}")
+            logger.info("✅ TOOL SUCCESS: %s (%.3fs)", tool_name, duration)
+            logger.debug("   Result: %s", result)
             
             # メトリクス記録
             metrics.record_tool_call(tool_name, duration)
@@ -178,11 +268,11 @@ def trace_tool(func: Callable) -> Callable:
             return result
             
         except Exception as e:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             
             # エラーログ
-            logger.error(f"❌ TOOL ERROR: {tool_name} ({duration:.3f}s)")
-            logger.error(f"   Error: {str(e)}")
+            logger.error("❌ TOOL ERROR: %s (%.3fs)", tool_name, duration)
+            logger.error("   Error: %s", e)
             
             raise
     
@@ -193,8 +283,18 @@ def trace_tool(func: Callable) -> Callable:
 # 4. トレース対応ツール
 # ===========================================
 
+# シミュレートされたデータベース（検索用に小文字化した名前と組にしておく）
+_MOCK_RESULTS = tuple(
+    (r, r["name"].lower())
+    for r in (
+        {"id": 1, "name": "Product A", "price": 100},
+        {"id": 2, "name": "Product B", "price": 200},
+        {"id": 3, "name": "Product C", "price": 150},
+    )
+)
+
 @trace_tool
-def search_database(query: str, limit: int = 10) -> dict:
+async def search_database(query: str, limit: int = 10) -> dict:
     """
     Search the database for records.
     
@@ -206,20 +306,14 @@ def search_database(query: str, limit: int = 10) -> dict:
         dict: Search results
     """
     # シミュレートされた処理時間
-    time.sleep(0.1)
+    await asyncio.sleep(0.1)
     
     if not query:
         return {"status": "error", "message": "Query cannot be empty"}
     
-    # シミュレートされたデータベース検索
-    mock_results = [
-        {"id": 1, "name": "Product A", "price": 100},
-        {"id": 2, "name": "Product B", "price": 200},
-        {"id": 3, "name": "Product C", "price": 150},
-    ]
-    
-    # クエリでフィルタリング
-    filtered = [r for r in mock_results if query.lower() in r["name"].lower()][:limit]
+    # クエリでフィルタリング（返す結果はコピー）
+    q = query.lower()
+    filtered = [dict(r) for r, name_lower in _MOCK_RESULTS if q in name_lower][:limit]
     
     return {
         "status": "success",
@@ -230,7 +324,7 @@ def search_database(query: str, limit: int = 10) -> dict:
 
 
 @trace_tool
-def calculate_total(items: list, discount_percent: float = 0) -> dict:
+async def calculate_total(items: list, discount_percent: float = 0) -> dict:
     """
     Calculate the total price of items with optional discount.
     
@@ -241,7 +335,7 @@ def calculate_total(items: list, discount_percent: float = 0) -> dict:
     Returns:
         dict: Calculation result
     """
-    time.sleep(0.05)
+    await asyncio.sleep(0.05)
     
     if not items:
         return {"status": "error", "message": "Items list cannot be empty"}
@@ -263,7 +357,7 @@ def calculate_total(items: list, discount_percent: float = 0) -> dict:
 
 
 @trace_tool
-def get_user_info(user_id: str) -> dict:
+async def get_user_info(user_id: str) -> dict:
     """
     Get user information by ID.
     
@@ -273,7 +367,7 @@ def get_user_info(user_id: str) -> dict:
     Returns:
         dict: User information
     """
-    time.sleep(0.08)
+    await asyncio.sleep(0.08)
     
     # シミュレートされたユーザーデータ
     users = {
@@ -314,35 +408,38 @@ Always provide clear responses based on tool results.
 # 6. トレース対応の実行関数
 # ===========================================
 
+APP_NAME = "observable_app"
+
+# 全リクエストで共有するセッションサービスとRunner
+_SESSION_SERVICE = InMemorySessionService()
+_RUNNER = Runner(
+    agent=observable_agent,
+    app_name=APP_NAME,
+    session_service=_SESSION_SERVICE
+)
+
 async def run_with_tracing(user_input: str, session_id: str = None) -> str:
     """トレーシング付きでエージェントを実行"""
     
     trace_id = f"trace_{datetime.now().strftime('%H%M%S%f')}"
-    start_time = time.time()
+    start_time = time.perf_counter()
     
-    logger.info(f"🚀 REQUEST START [trace_id={trace_id}]")
-    logger.info(f"   Input: {user_input}")
+    logger.info("🚀 REQUEST START [trace_id=%s]", trace_id)
+    logger.info("   Input: %s", user_input)
     
     try:
-        session_service = InMemorySessionService()
-        session = await session_service.create_session(
-            app_name="observable_app",
+        session = await _SESSION_SERVICE.create_session(
+            app_name=APP_NAME,
             user_id="user1"
         )
         
-        runner = Runner(
-            agent=observable_agent,
-            app_name="observable_app",
-            session_service=session_service
-        )
-        
         content = types.Content(
             role="user",
             parts=[types.Part(text=user_input)]
         )
         
         response_text = ""
-        async for event in runner.run_async(
+        async for event in _RUNNER.run_async(
             user_id="user1",
             session_id=session.id,
             new_message=content
@@ -350,20 +447,20 @@ async def run_with_tracing(user_input: str, session_id: str = None) -> str:
             if event.is_final_response():
                 response_text = event.content.parts[0].text
         
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         
-        logger.info(f"✅ REQUEST SUCCESS [trace_id={trace_id}] ({duration:.3f}s)")
-        logger.debug(f"   Response: {response_text[:100]}...")
+        logger.info("✅ REQUEST SUCCESS [trace_id=%s] (%.3fs)", trace_id, duration)
+        logger.debug("   Response: %.100s...", response_text)
         
         metrics.record_request(success=True, duration=duration)
         
         return response_text
         
     except Exception as e:
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         
-        logger.error(f"❌ REQUEST FAILED [trace_id={trace_id}] ({duration:.3f}s)")
-        logger.error(f"   Error: {str(e)}")
+        logger.error("❌ REQUEST FAILED [trace_id=%s] (%.3fs)", trace_id, duration)
+        logger.error("   Error: %s", e)
         
         metrics.record_request(success=False, duration=duration, error=str(e))
         
@@ -15,14 +15,23 @@ Day 4B: Agent Evaluation
 """
 
 import asyncio
+import hashlib
 import os
 import json
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
 from datetime import datetime
 from dataclasses import dataclass, field, asdict
+from functools import lru_cache
 from typing import Optional
 from enum import Enum
 from dotenv import load_dotenv
 
+try:
+    from orjson import loads as _json_loads  # Optional: faster parsing
+except ImportError:
+    _json_loads = json.loads
+
 load_dotenv()
 
 from google.adk.agents import Agent
@@ -42,7 +51,7 @@ class EvalResult(Enum):
     PARTIAL = "PARTIAL"
 
 
-@dataclass
+@dataclass(slots=True)
 class TestCase:
     """テストケースの定義"""
     id: str
@@ -51,9 +60,13 @@ class TestCase:
     expected_keywords: list[str]  # 応答に含まれるべきキーワード
     expected_tool_calls: list[str] = field(default_factory=list)  # 呼び出されるべきツール
     description: str = ""
+    expected_keywords_lc: list[str] = field(init=False, repr=False, compare=False)  # 小文字化済みキーワード
+    
+    def __post_init__(self):
+        self.expected_keywords_lc = [k.lower() for k in self.expected_keywords]
 
 
-@dataclass
+@dataclass(slots=True)
 class EvalScore:
     """評価スコア"""
     relevance: float = 0.0      # 関連性 (0-1)
@@ -67,7 +80,7 @@ class EvalScore:
         return (self.relevance + self.accuracy + self.completeness + self.helpfulness) / 4
 
 
-@dataclass
+@dataclass(slots=True)
 class TestResult:
     """テスト結果"""
     test_case: TestCase
@@ -79,6 +92,17 @@ class TestResult:
     llm_eval_feedback: str = ""
     execution_time: float = 0.0
     error: str = ""
+    console_output: list[str] = field(default_factory=list)  # 実行中の表示内容（並行実行時は後でまとめて表示）
+    keywords_matched: int = field(init=False, compare=False)  # マッチしたキーワード数
+    keywords_total: int = field(init=False, compare=False)
+    tools_called: int = field(init=False, compare=False)  # 呼び出されたツール数
+    tools_total: int = field(init=False, compare=False)
+    
+    def __post_init__(self):
+        self.keywords_matched = sum(self.keyword_matches.values())
+        self.keywords_total = len(self.keyword_matches)
+        self.tools_called = sum(self.tool_call_matches.values())
+        self.tools_total = len(self.tool_call_matches)
 
 
 # ===========================================
@@ -229,14 +253,16 @@ TEST_CASES = [
 # 4. エージェント実行関数
 # ===========================================
 
-# ツール呼び出しを記録するためのグローバル変数
-tool_calls_log = []
+# ツール呼び出しを記録するリスト（テストケースごと。並行実行しても混ざらないよう ContextVar で保持）
+tool_calls_log: ContextVar[Optional[list]] = ContextVar("tool_calls_log", default=None)
 
 
 def create_logged_tool(func):
     """ツール呼び出しをログするラッパー関数を作成"""
     def wrapper(*args, **kwargs):
-        tool_calls_log.append(func.__name__)
+        calls = tool_calls_log.get()
+        if calls is not None:
+            calls.append(func.__name__)
         return func(*args, **kwargs)
     
     # 重要: 元の関数の属性をコピー
@@ -251,85 +277,217 @@ def create_logged_tool(func):
     return wrapper
 
 
+EVAL_APP_NAME = "eval_app"
+
+# 評価用エージェント（ツール呼び出しをログするツールを使用、全テストケースで共有）
+eval_agent = Agent(
+    model='gemini-2.0-flash',
+    name='weather_assistant',
+    description=weather_agent.description,
+    instruction=weather_agent.instruction,
+    tools=[
+        create_logged_tool(get_weather),
+        create_logged_tool(convert_temperature),
+        create_logged_tool(get_recommendation)
+    ],
+)
+
+# 全テストケースで共有するセッションサービスとRunner
+_SESSION_SERVICE = InMemorySessionService()
+_RUNNER = Runner(
+    agent=eval_agent,
+    app_name=EVAL_APP_NAME,
+    session_service=_SESSION_SERVICE
+)
+
+
 async def run_agent_for_eval(query: str) -> tuple[str, list[str], float]:
     """評価用にエージェントを実行"""
     import time
     
-    global tool_calls_log
-    tool_calls_log = []
-    
-    start_time = time.time()
-    
-    session_service = InMemorySessionService()
-    session = await session_service.create_session(
-        app_name="eval_app",
-        user_id="eval_user"
-    )
-    
-    # ログ付きツールを作成
-    logged_get_weather = create_logged_tool(get_weather)
-    logged_convert_temperature = create_logged_tool(convert_temperature)
-    logged_get_recommendation = create_logged_tool(get_recommendation)
-    
-    # 評価用エージェントを作成
-    eval_agent = Agent(
-        model='gemini-2.0-flash',
-        name='weather_assistant',
-        description=weather_agent.description,
-        instruction=weather_agent.instruction,
-        tools=[
-            logged_get_weather,
-            logged_convert_temperature,
-            logged_get_recommendation
-        ],
-    )
-    
-    runner = Runner(
-        agent=eval_agent,
-        app_name="eval_app",
-        session_service=session_service
-    )
-    
-    content = types.Content(
-        role="user",
-        parts=[types.Part(text=query)]
-    )
-    
-    response_text = ""
-    async for event in runner.run_async(
-        user_id="eval_user",
-        session_id=session.id,
-        new_message=content
-    ):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+    # このクエリ専用のツール呼び出しログ（終了時に元に戻す）
+    calls = []
+    token = tool_calls_log.set(calls)
     
-    execution_time = time.time() - start_time
+    start_time = time.perf_counter()
     
-    return response_text, tool_calls_log.copy(), execution_time
+    try:
+        session = await _SESSION_SERVICE.create_session(
+            app_name=EVAL_APP_NAME,
+            user_id="eval_user"
+        )
+        
+        content = types.Content(
+            role="user",
+            parts=[types.Part(text=query)]
+        )
+        
+        response_text = ""
+        async for event in _RUNNER.run_async(
+            user_id="eval_user",
+            session_id=session.id,
+            new_message=content
+        ):
+            if event.is_final_response():
+                response_text = event.content.parts[0].text
+    finally:
+        tool_calls_log.reset(token)
+    
+    execution_time = time.perf_counter() - start_time
+    
+    return response_text, calls, execution_time
 # ===========================================
 # 5. 評価関数
 # ===========================================
 
-def evaluate_keywords(response: str, expected_keywords: list[str]) -> dict:
-    """キーワードマッチの評価"""
+def evaluate_keywords(
+    response: str,
+    expected_keywords: list[str],
+    expected_keywords_lc: Optional[list[str]] = None
+) -> dict:
+    """キーワードマッチの評価（expected_keywords_lc は小文字化済みのキーワード）"""
     response_lower = response.lower()
-    matches = {}
-    
-    for keyword in expected_keywords:
-        matches[keyword] = keyword.lower() in response_lower
+    if expected_keywords_lc is None:
+        expected_keywords_lc = [k.lower() for k in expected_keywords]
     
-    return matches
+    return {
+        keyword: keyword_lc in response_lower
+        for keyword, keyword_lc in zip(expected_keywords, expected_keywords_lc)
+    }
 
 
 def evaluate_tool_calls(actual_calls: list[str], expected_calls: list[str]) -> dict:
     """ツール呼び出しの評価"""
-    matches = {}
+    called = set(actual_calls)
+    return {expected: expected in called for expected in expected_calls}
+
+
+# LLM審判の評価結果キャッシュ（同じ入力を繰り返し評価しない）
+class InMemoryJudgeCache:
+    """プロセス内のLRUキャッシュ（上限件数を超えたら最も古いものから削除）"""
+    
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+    
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._data.get(key)
+        if value is None:
+            return None
+        self._data.move_to_end(key)
+        return dict(value)
+    
+    async def set(self, key: str, value: dict, ttl: int = 86400):
+        self._data[key] = dict(value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class RedisJudgeCache:
+    """Redis を使うキャッシュ（複数プロセス・複数回の実行で共有）"""
     
-    for expected in expected_calls:
-        matches[expected] = expected in actual_calls
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # Optional dependency
+        self._client = redis.from_url(url)
     
-    return matches
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self._client.get(f"eval_judge:{key}")
+        return _json_loads(value) if value is not None else None
+    
+    async def set(self, key: str, value: dict, ttl: int = 86400):
+        await self._client.set(f"eval_judge:{key}", json.dumps(value), ex=ttl)
+
+
+def create_judge_cache():
+    """EVAL_CACHE_BACKEND 環境変数に応じてキャッシュを作成（既定はプロセス内）"""
+    if os.getenv("EVAL_CACHE_BACKEND", "memory").lower() == "redis":
+        try:
+            return RedisJudgeCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        except ImportError:
+            print("⚠️ redis がインストールされていないため、プロセス内キャッシュを使用します")
+    return InMemoryJudgeCache()
+
+
+judge_cache = create_judge_cache()
+
+
+async def _cache_get(key: str) -> Optional[dict]:
+    """キャッシュから取得（バックエンドのエラーはキャッシュミスとして扱う）"""
+    try:
+        return await judge_cache.get(key)
+    except Exception as e:
+        print(f"⚠️ 評価キャッシュの読み込みに失敗しました（キャッシュなしで続行）: {e}")
+        return None
+
+
+async def _cache_set(key: str, value: dict):
+    """キャッシュに保存（バックエンドのエラーは無視し、評価結果はそのまま使う）"""
+    try:
+        await judge_cache.set(key, value)
+    except Exception as e:
+        print(f"⚠️ 評価キャッシュへの保存に失敗しました: {e}")
+
+
+def judge_cache_key(query: str, response: str, test_case: TestCase) -> str:
+    """評価プロンプトの入力から決まるキャッシュキー"""
+    payload = json.dumps({
+        "q": query,
+        "r": response,
+        "d": test_case.description,
+        "k": test_case.expected_keywords,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """テキスト中の最初のJSONオブジェクトを取り出す（ネストした {} にも対応）"""
+    # JSONモードの応答はそのままパースできるので、まずは全体を一度でパース
+    try:
+        obj = _json_loads(text)
+        if isinstance(obj, dict):
+            return obj
+    except ValueError:
+        pass
+    
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, idx)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        idx = text.find("{", idx + 1)
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """LLM審判用のクライアント（初回呼び出し時に作成し、以降は同じ接続を再利用）"""
+    return genai.Client()
+
+
+# 評価基準（単体評価・バッチ評価で共通）
+_JUDGE_CRITERIA = """Please evaluate the response on these criteria (score 0.0 to 1.0):
+1. RELEVANCE: How relevant is the response to the user's query?
+2. ACCURACY: How accurate is the information provided?
+3. COMPLETENESS: Does the response fully address the query?
+4. HELPFULNESS: How helpful is the response to the user?"""
+
+
+def _score_from_json(eval_data: dict) -> tuple[EvalScore, str]:
+    """判定結果のJSONを EvalScore とフィードバックに変換"""
+    score = EvalScore(
+        relevance=float(eval_data.get("relevance", 0)),
+        accuracy=float(eval_data.get("accuracy", 0)),
+        completeness=float(eval_data.get("completeness", 0)),
+        helpfulness=float(eval_data.get("helpfulness", 0))
+    )
+    return score, eval_data.get("feedback", "")
 
 
 async def llm_evaluate_response(
@@ -337,9 +495,15 @@ async def llm_evaluate_response(
     response: str,
     test_case: TestCase
 ) -> tuple[EvalScore, str]:
-    """LLM-as-a-Judge: LLMを使って応答を評価"""
+    """LLM-as-a-Judge: LLMを使って応答を評価（同じ入力の評価結果はキャッシュを使用）"""
     
-    client = genai.Client()
+    cache_key = judge_cache_key(query, response, test_case)
+    cached = await _cache_get(cache_key)
+    if cached is not None:
+        feedback = cached.pop("feedback", "")
+        return EvalScore(**cached), feedback
+    
+    client = get_genai_client()
     
     eval_prompt = f"""You are an AI response evaluator. Evaluate the following agent response based on the given criteria.
 
@@ -351,11 +515,7 @@ TEST DESCRIPTION: {test_case.description}
 
 EXPECTED KEYWORDS: {', '.join(test_case.expected_keywords)}
 
-Please evaluate the response on these criteria (score 0.0 to 1.0):
-1. RELEVANCE: How relevant is the response to the user's query?
-2. ACCURACY: How accurate is the information provided?
-3. COMPLETENESS: Does the response fully address the query?
-4. HELPFULNESS: How helpful is the response to the user?
+{_JUDGE_CRITERIA}
 
 Respond in this exact JSON format:
 {{
@@ -368,26 +528,20 @@ Respond in this exact JSON format:
 """
     
     try:
-        eval_response = client.models.generate_content(
+        # JSONモードで応答させる
+        eval_response = await client.aio.models.generate_content(
             model='gemini-2.0-flash',
-            contents=eval_prompt
+            contents=eval_prompt,
+            config=types.GenerateContentConfig(response_mime_type="application/json")
         )
         
-        # JSONをパース
+        # JSONをパース（前後に余分なテキストがあればJSON部分を抽出）
         response_text = eval_response.text
-        # JSON部分を抽出
-        import re
-        json_match = re.search(r'\{[^{}]*\}', response_text, re.DOTALL)
+        eval_data = extract_json_object(response_text)
         
-        if json_match:
-            eval_data = json.loads(json_match.group())
-            score = EvalScore(
-                relevance=float(eval_data.get("relevance", 0)),
-                accuracy=float(eval_data.get("accuracy", 0)),
-                completeness=float(eval_data.get("completeness", 0)),
-                helpfulness=float(eval_data.get("helpfulness", 0))
-            )
-            feedback = eval_data.get("feedback", "")
+        if eval_data is not None:
+            score, feedback = _score_from_json(eval_data)
+            await _cache_set(cache_key, asdict(score) | {"feedback": feedback})
             return score, feedback
     except Exception as e:
         print(f"LLM evaluation error: {e}")
@@ -395,6 +549,88 @@ Respond in this exact JSON format:
     return EvalScore(), "Evaluation failed"
 
 
+async def llm_evaluate_batch(
+    items: list[tuple[str, str, TestCase]]
+) -> list[tuple[EvalScore, str]]:
+    """
+    LLM-as-a-Judge（バッチ版）: 複数の応答を1回のリクエストでまとめて評価
+    
+    items は (query, response, test_case) のリスト。キャッシュ済みの項目はリクエストに含めず、
+    バッチの結果に含まれなかった項目は llm_evaluate_response で個別に評価する。
+    """
+    results: list[Optional[tuple[EvalScore, str]]] = [None] * len(items)
+    keys = [judge_cache_key(query, response, test_case) for query, response, test_case in items]
+    
+    pending = []
+    for i, key in enumerate(keys):
+        cached = await _cache_get(key)
+        if cached is None:
+            pending.append(i)
+        else:
+            feedback = cached.pop("feedback", "")
+            results[i] = (EvalScore(**cached), feedback)
+    
+    if pending:
+        item_blocks = "\n".join(
+            f"""--- ITEM {n} ---
+USER QUERY: {items[i][0]}
+
+AGENT RESPONSE: {items[i][1]}
+
+TEST DESCRIPTION: {items[i][2].description}
+
+EXPECTED KEYWORDS: {', '.join(items[i][2].expected_keywords)}
+"""
+            for n, i in enumerate(pending)
+        )
+        
+        eval_prompt = f"""You are an AI response evaluator. Evaluate each of the following agent responses independently based on the given criteria.
+
+{item_blocks}
+{_JUDGE_CRITERIA}
+
+Respond with a JSON array containing one object per item, in this exact format:
+[
+    {{
+        "item": <item number>,
+        "relevance": <score>,
+        "accuracy": <score>,
+        "completeness": <score>,
+        "helpfulness": <score>,
+        "feedback": "<brief explanation of scores>"
+    }}
+]
+"""
+        
+        try:
+            eval_response = await get_genai_client().aio.models.generate_content(
+                model='gemini-2.0-flash',
+                contents=eval_prompt,
+                config=types.GenerateContentConfig(response_mime_type="application/json")
+            )
+            
+            eval_list = _json_loads(eval_response.text)
+            for eval_data in eval_list if isinstance(eval_list, list) else []:
+                n = eval_data.get("item") if isinstance(eval_data, dict) else None
+                if not isinstance(n, int) or not 0 <= n < len(pending):
+                    continue
+                i = pending[n]
+                score, feedback = _score_from_json(eval_data)
+                results[i] = (score, feedback)
+                await _cache_set(keys[i], asdict(score) | {"feedback": feedback})
+        except Exception as e:
+            print(f"LLM batch evaluation error: {e}")
+    
+    # バッチで評価できなかった項目は個別に評価
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fallback = await asyncio.gather(*(llm_evaluate_response(*items[i]) for i in missing))
+        for i, result in zip(missing, fallback):
+            results[i] = result
+    
+    return results
+
+
 def determine_result(
     keyword_matches: dict,
     tool_matches: dict,
@@ -431,29 +667,45 @@ class AgentEvaluator:
         self.test_cases = test_cases
         self.results: list[TestResult] = []
     
-    async def run_single_test(self, test_case: TestCase, use_llm_judge: bool = True) -> TestResult:
-        """単一のテストを実行"""
-        print(f"\n  🧪 Running: {test_case.id} - {test_case.name}")
+    async def run_single_test(
+        self,
+        test_case: TestCase,
+        use_llm_judge: bool = True,
+        echo: bool = True
+    ) -> TestResult:
+        """単一のテストを実行（echo=False の場合は表示内容を console_output に溜める）"""
+        output = []
+        
+        def emit(text: str):
+            output.append(text)
+            if echo:
+                print(text)
+        
+        emit(self._header_line(test_case))
         
         try:
             # エージェント実行
             response, tool_calls, exec_time = await run_agent_for_eval(test_case.input_query)
             
+            # LLM評価（応答が得られたらすぐに開始し、その間に他の評価を行う）
+            judge_task = asyncio.create_task(llm_evaluate_response(
+                test_case.input_query,
+                response,
+                test_case
+            )) if use_llm_judge else None
+            
             # キーワード評価
-            keyword_matches = evaluate_keywords(response, test_case.expected_keywords)
+            keyword_matches = evaluate_keywords(
+                response, test_case.expected_keywords, test_case.expected_keywords_lc
+            )
             
             # ツール呼び出し評価
             tool_matches = evaluate_tool_calls(tool_calls, test_case.expected_tool_calls)
             
-            # LLM評価
             llm_score = None
             llm_feedback = ""
-            if use_llm_judge:
-                llm_score, llm_feedback = await llm_evaluate_response(
-                    test_case.input_query,
-                    response,
-                    test_case
-                )
+            if judge_task is not None:
+                llm_score, llm_feedback = await judge_task
             
             # 結果判定
             result = determine_result(keyword_matches, tool_matches, llm_score)
@@ -466,15 +718,13 @@ class AgentEvaluator:
                 tool_call_matches=tool_matches,
                 llm_eval_score=llm_score,
                 llm_eval_feedback=llm_feedback,
-                execution_time=exec_time
+                execution_time=exec_time,
+                console_output=output
             )
             
             # 結果表示
-            status_icon = "✅" if result == EvalResult.PASS else "⚠️" if result == EvalResult.PARTIAL else "❌"
-            print(f"     {status_icon} Result: {result.value}")
-            print(f"     ⏱️  Time: {exec_time:.2f}s")
-            if llm_score:
-                print(f"     📊 LLM Score: {llm_score.overall:.2f}")
+            for text in self._result_lines(test_result):
+                emit(text)
             
             return test_result
             
@@ -485,20 +735,90 @@ class AgentEvaluator:
                 result=EvalResult.FAIL,
                 keyword_matches={},
                 tool_call_matches={},
-                error=str(e)
+                error=str(e),
+                console_output=output
             )
     
-    async def run_all_tests(self, use_llm_judge: bool = True) -> list[TestResult]:
-        """すべてのテストを実行"""
+    @staticmethod
+    def _header_line(test_case: TestCase) -> str:
+        """テスト開始の表示"""
+        return f"\n  🧪 Running: {test_case.id} - {test_case.name}"
+    
+    @staticmethod
+    def _result_lines(test_result: TestResult) -> list[str]:
+        """テスト結果の表示"""
+        result = test_result.result
+        status_icon = "✅" if result == EvalResult.PASS else "⚠️" if result == EvalResult.PARTIAL else "❌"
+        lines = [
+            f"     {status_icon} Result: {result.value}",
+            f"     ⏱️  Time: {test_result.execution_time:.2f}s",
+        ]
+        if test_result.llm_eval_score:
+            lines.append(f"     📊 LLM Score: {test_result.llm_eval_score.overall:.2f}")
+        return lines
+    
+    async def _judge_in_batches(self, results: list[TestResult], batch_size: int, concurrency: int):
+        """エージェントの実行が終わったテストをまとめてLLM評価し、結果を更新"""
+        # 応答の長さが近いもの同士を同じバッチにして、長い応答1件にバッチ全体が待たされないようにする
+        judged = sorted((r for r in results if not r.error), key=lambda r: len(r.actual_response))
+        batches = [judged[i:i + batch_size] for i in range(0, len(judged), batch_size)]
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def judge_batch(batch: list[TestResult]):
+            async with semaphore:
+                verdicts = await llm_evaluate_batch([
+                    (r.test_case.input_query, r.actual_response, r.test_case) for r in batch
+                ])
+            for r, (score, feedback) in zip(batch, verdicts):
+                r.llm_eval_score = score
+                r.llm_eval_feedback = feedback
+                r.result = determine_result(r.keyword_matches, r.tool_call_matches, score)
+                r.console_output = [self._header_line(r.test_case), *self._result_lines(r)]
+        
+        await asyncio.gather(*(judge_batch(batch) for batch in batches))
+    
+    async def run_all_tests(
+        self,
+        use_llm_judge: bool = True,
+        concurrency: Optional[int] = None,
+        judge_batch_size: Optional[int] = None
+    ) -> list[TestResult]:
+        """
+        すべてのテストを実行
+        
+        テストケースは互いに独立しているので並行実行する。
+        同時実行数は concurrency（省略時は環境変数 EVAL_CONCURRENCY、既定 8）まで。
+        LLM評価は judge_batch_size 件ずつ1回のリクエストにまとめる
+        （省略時は環境変数 EVAL_JUDGE_BATCH_SIZE、既定 4。1 でテストごとに評価）。
+        """
         print("\n" + "=" * 70)
         print("🔬 RUNNING AGENT EVALUATION TESTS")
         print("=" * 70)
         
-        self.results = []
+        if concurrency is None:
+            concurrency = int(os.getenv("EVAL_CONCURRENCY", "8"))
+        if judge_batch_size is None:
+            judge_batch_size = int(os.getenv("EVAL_JUDGE_BATCH_SIZE", "4"))
+        batch_judge = use_llm_judge and judge_batch_size > 1
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_limited(test_case: TestCase) -> TestResult:
+            async with semaphore:
+                return await self.run_single_test(
+                    test_case, use_llm_judge and not batch_judge, echo=False
+                )
         
-        for test_case in self.test_cases:
-            result = await self.run_single_test(test_case, use_llm_judge)
-            self.results.append(result)
+        self.results = list(await asyncio.gather(
+            *(run_limited(test_case) for test_case in self.test_cases)
+        ))
+        
+        if batch_judge:
+            await self._judge_in_batches(self.results, judge_batch_size, concurrency)
+        
+        # 表示が混ざらないよう、テストケースの順にまとめて表示
+        for result in self.results:
+            for text in result.console_output:
+                print(text)
         
         return self.results
     
@@ -508,9 +828,10 @@ class AgentEvaluator:
             return "No test results available."
         
         total = len(self.results)
-        passed = sum(1 for r in self.results if r.result == EvalResult.PASS)
-        partial = sum(1 for r in self.results if r.result == EvalResult.PARTIAL)
-        failed = sum(1 for r in self.results if r.result == EvalResult.FAIL)
+        counts = Counter(r.result for r in self.results)
+        passed = counts[EvalResult.PASS]
+        partial = counts[EvalResult.PARTIAL]
+        failed = counts[EvalResult.FAIL]
         
         avg_time = sum(r.execution_time for r in self.results) / total
         
@@ -518,7 +839,8 @@ class AgentEvaluator:
         llm_scores = [r.llm_eval_score for r in self.results if r.llm_eval_score]
         avg_llm_score = sum(s.overall for s in llm_scores) / len(llm_scores) if llm_scores else 0
         
-        report = f"""
+        # 文字列の += を繰り返さず、リストに溜めて最後に join する
+        parts = [f"""
 {'=' * 70}
 📋 AGENT EVALUATION REPORT
 {'=' * 70}
@@ -540,28 +862,28 @@ class AgentEvaluator:
 {'─' * 70}
 📝 DETAILED RESULTS
 {'─' * 70}
-"""
+"""]
         
         for result in self.results:
             status = "✅" if result.result == EvalResult.PASS else "⚠️" if result.result == EvalResult.PARTIAL else "❌"
             
-            report += f"""
+            parts.append(f"""
   {status} {result.test_case.id}: {result.test_case.name}
      Query: {result.test_case.input_query}
      Response: {result.actual_response[:100]}...
-     Keywords: {sum(result.keyword_matches.values())}/{len(result.keyword_matches)} matched
-     Tools: {sum(result.tool_call_matches.values())}/{len(result.tool_call_matches)} called
-"""
+     Keywords: {result.keywords_matched}/{result.keywords_total} matched
+     Tools: {result.tools_called}/{result.tools_total} called
+""")
             if result.llm_eval_score:
-                report += f"""     LLM Score: {result.llm_eval_score.overall:.2f}
+                parts.append(f"""     LLM Score: {result.llm_eval_score.overall:.2f}
      Feedback: {result.llm_eval_feedback[:100]}...
-"""
+""")
             if result.error:
-                report += f"     Error: {result.error}\n"
+                parts.append(f"     Error: {result.error}\n")
         
-        report += f"\n{'=' * 70}\n"
+        parts.append(f"\n{'=' * 70}\n")
         
-        return report
+        return "".join(parts)
     
     def print_report(self):
         """レポートを表示"""
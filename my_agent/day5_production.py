@@ -12,44 +12,81 @@ Day 5: Prototype to Production
 """
 
 import asyncio
+import atexit
+import logging
 import os
+import queue
+import random
+import re
 import time
+from collections import deque
+from contextlib import aclosing
 from datetime import datetime
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Union
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from google.adk.agents import Agent
+from google.adk.models import Gemini
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
 
+# ===========================================
+# ロギングの設定
+# ===========================================
+
+# 並行実行中のコルーチンはキューに積むだけにし、書き出しは QueueListener のスレッドが行う
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+logger = logging.getLogger("multi_agent")
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
 # ===========================================
 # 1. 専門エージェントの定義
 # ===========================================
 
+# 全エージェントで1つのモデルインスタンスを共有する
+# （モデル名の文字列だと呼び出しのたびにモデルと API クライアントが作られ、HTTP 接続も使い回されない）
+MODEL = Gemini(model='gemini-2.0-flash')
+
 # --- Research Agent（調査エージェント）---
+# シミュレートされたWeb検索の結果（キーワード, 結果）
+_MOCK_SEARCH_RESULTS = (
+    ("ai trends", "Top AI trends in 2025: Multi-agent systems, AI agents in production, Context engineering"),
+    ("python best practices", "Python best practices: Type hints, async/await, virtual environments, testing"),
+    ("machine learning", "ML advances: Foundation models, fine-tuning, RAG systems, agent architectures"),
+)
+
+
 def search_web(query: str) -> dict:
     """Search the web for information."""
-    # シミュレートされたWeb検索
-    mock_results = {
-        "ai trends": "Top AI trends in 2025: Multi-agent systems, AI agents in production, Context engineering",
-        "python best practices": "Python best practices: Type hints, async/await, virtual environments, testing",
-        "machine learning": "ML advances: Foundation models, fine-tuning, RAG systems, agent architectures",
-    }
-    
-    for key, value in mock_results.items():
-        if key in query.lower():
+    query_lower = query.lower()
+    for key, value in _MOCK_SEARCH_RESULTS:
+        if key in query_lower:
             return {"status": "success", "query": query, "results": value}
     
     return {"status": "success", "query": query, "results": f"General information about: {query}"}
 
 
 research_agent = Agent(
-    model='gemini-2.0-flash',
+    model=MODEL,
     name='research_agent',
     description="A research specialist that searches for information.",
     instruction="""You are a research specialist. Your job is to:
@@ -64,24 +101,28 @@ Always use the search_web tool to find information before responding.
 
 
 # --- Analysis Agent（分析エージェント）---
+# 分析結果のテンプレート（呼び出し時は選ばれた1つだけを format する）
+_ANALYSIS_TEMPLATES = {
+    "summary": "Summary: {data:.100}... Key points extracted.",
+    "sentiment": "Sentiment Analysis: The text appears to be neutral/informative in tone.",
+    "keywords": "Key Topics: AI, agents, production, development",
+    "recommendations": "Recommendations based on analysis: Focus on testing, monitoring, and scalability.",
+}
+
+
 def analyze_data(data: str, analysis_type: str = "summary") -> dict:
     """Analyze data and provide insights."""
-    analysis_types = {
-        "summary": f"Summary: {data[:100]}... Key points extracted.",
-        "sentiment": f"Sentiment Analysis: The text appears to be neutral/informative in tone.",
-        "keywords": f"Key Topics: AI, agents, production, development",
-        "recommendations": f"Recommendations based on analysis: Focus on testing, monitoring, and scalability.",
-    }
+    template = _ANALYSIS_TEMPLATES.get(analysis_type)
     
     return {
         "status": "success",
         "analysis_type": analysis_type,
-        "result": analysis_types.get(analysis_type, "General analysis completed.")
+        "result": template.format(data=data) if template else "General analysis completed."
     }
 
 
 analysis_agent = Agent(
-    model='gemini-2.0-flash',
+    model=MODEL,
     name='analysis_agent',
     description="An analysis specialist that processes and analyzes data.",
     instruction="""You are an analysis specialist. Your job is to:
@@ -96,13 +137,12 @@ Use different analysis types: summary, sentiment, keywords, recommendations.
 
 
 # --- Writer Agent（執筆エージェント）---
-def format_document(content: str, format_type: str = "report") -> dict:
-    """Format content into a structured document."""
-    templates = {
-        "report": f"""
+# ドキュメントのテンプレート（呼び出し時は選ばれた1つだけを format する）
+_DOCUMENT_TEMPLATES = {
+    "report": """
 # Report
 ## Executive Summary
-{content[:200]}...
+{content:.200}...
 
 ## Key Findings
 - Finding 1
@@ -112,19 +152,19 @@ def format_document(content: str, format_type: str = "report") -> dict:
 ## Conclusion
 Based on the analysis...
 """,
-        "email": f"""
+    "email": """
 Subject: Summary Report
 
 Dear Team,
 
-{content[:150]}...
+{content:.150}...
 
 Best regards,
 AI Assistant
 """,
-        "presentation": f"""
+    "presentation": """
 # Slide 1: Title
-{content[:50]}
+{content:.50}
 
 # Slide 2: Key Points
 - Point 1
@@ -133,17 +173,22 @@ AI Assistant
 # Slide 3: Conclusion
 Summary...
 """,
-    }
+}
+
+
+def format_document(content: str, format_type: str = "report") -> dict:
+    """Format content into a structured document."""
+    template = _DOCUMENT_TEMPLATES.get(format_type)
     
     return {
         "status": "success",
         "format": format_type,
-        "document": templates.get(format_type, content)
+        "document": template.format(content=content) if template else content
     }
 
 
 writer_agent = Agent(
-    model='gemini-2.0-flash',
+    model=MODEL,
     name='writer_agent',
     description="A writing specialist that creates formatted documents.",
     instruction="""You are a writing specialist. Your job is to:
@@ -177,7 +222,7 @@ def delegate_to_writer(content: str, format_type: str) -> dict:
 
 
 orchestrator_agent = Agent(
-    model='gemini-2.0-flash',
+    model=MODEL,
     name='orchestrator',
     description="A manager agent that coordinates tasks between specialist agents.",
     instruction="""You are a project manager that coordinates work between specialist agents.
@@ -202,7 +247,7 @@ Coordinate the workflow efficiently and summarize results.
 # 3. マルチエージェント実行クラス
 # ===========================================
 
-@dataclass
+@dataclass(slots=True)
 class AgentResult:
     """エージェントの実行結果"""
     agent_name: str
@@ -213,6 +258,70 @@ class AgentResult:
     error: str = ""
 
 
+@dataclass(slots=True)
+class WorkflowTask:
+    """
+    依存関係付きのタスク
+    query の中の {{タスク名}} は依存先タスクの出力に置き換えられる
+    """
+    name: str
+    agent_name: str
+    query: str
+    deps: list[str] = field(default_factory=list)
+
+
+_TEMPLATE_RE = re.compile(r"\{\{(\w+)\}\}")
+
+# 次のタスクに渡す前のタスクの出力の最大文字数
+CONTEXT_CHARS = 500
+
+
+def resolve_template(task: WorkflowTask, outputs: dict[str, str]) -> str:
+    """{{タスク名}} を依存先の出力で置き換え、クエリで参照されなかった依存先の出力は末尾に追加"""
+    query = _TEMPLATE_RE.sub(
+        lambda m: outputs[m.group(1)][:CONTEXT_CHARS] if m.group(1) in outputs else m.group(0),
+        task.query
+    )
+    referenced = set(_TEMPLATE_RE.findall(task.query))
+    for dep in task.deps:
+        if dep not in referenced and dep in outputs:
+            query += f"\n\nContext from {dep}: {outputs[dep][:CONTEXT_CHARS]}"
+    return query
+
+
+def topological_phases(tasks: list[WorkflowTask]) -> list[list[WorkflowTask]]:
+    """タスクを依存関係の順にフェーズへ分ける（同じフェーズのタスクは互いに独立）"""
+    by_name = {task.name: task for task in tasks}
+    if len(by_name) != len(tasks):
+        raise ValueError("Task names must be unique")
+    for task in tasks:
+        for dep in task.deps:
+            if dep not in by_name:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+    
+    phases = []
+    done = set()
+    remaining = list(tasks)
+    while remaining:
+        phase = [task for task in remaining if done.issuperset(task.deps)]
+        if not phase:
+            raise ValueError("Task dependencies contain a cycle: " + ", ".join(t.name for t in remaining))
+        phases.append(phase)
+        done.update(task.name for task in phase)
+        remaining = [task for task in remaining if task.name not in done]
+    return phases
+
+
+APP_NAME = "multi_agent_app"
+USER_ID = "user1"
+
+
+def _stopwatch():
+    """経過時間（秒）を返す関数を作成（time.perf_counter を使用）"""
+    start = time.perf_counter()
+    return lambda: time.perf_counter() - start
+
+
 class MultiAgentSystem:
     """マルチエージェントシステム"""
     
@@ -224,11 +333,26 @@ class MultiAgentSystem:
             "orchestrator": orchestrator_agent,
         }
         self.execution_log: list[AgentResult] = []
+        
+        # セッションサービスとエージェントごとの Runner は一度だけ作成して使い回す
+        self._session_service = InMemorySessionService()
+        self._runners = {
+            name: Runner(
+                agent=agent,
+                app_name=APP_NAME,
+                session_service=self._session_service
+            )
+            for name, agent in self.agents.items()
+        }
+        
+        # 待機時間を固定せず、実際のレート制限の範囲内でリクエストを流す
+        self._rate_limiter = AsyncRateLimiter(
+            ProductionConfig.RATE_LIMIT_REQUESTS,
+            ProductionConfig.RATE_LIMIT_PERIOD
+        )
     
     async def run_agent(self, agent_name: str, query: str) -> AgentResult:
         """単一のエージェントを実行"""
-        start_time = time.time()
-        
         if agent_name not in self.agents:
             return AgentResult(
                 agent_name=agent_name,
@@ -239,19 +363,20 @@ class MultiAgentSystem:
                 error=f"Agent '{agent_name}' not found"
             )
         
-        agent = self.agents[agent_name]
+        await self._rate_limiter.acquire()
+        elapsed = _stopwatch()
+        logger.info("🚀 %s started", agent_name)
+        
+        runner = self._runners[agent_name]
+        session = None
         
         try:
-            session_service = InMemorySessionService()
-            session = await session_service.create_session(
-                app_name="multi_agent_app",
-                user_id="user1"
-            )
-            
-            runner = Runner(
-                agent=agent,
-                app_name="multi_agent_app",
-                session_service=session_service
+            # 呼び出しごとに会話履歴を分けるため、セッションだけは新しく作る
+            # （システム指示とツール定義は毎回同じ先頭部分になるので、Gemini の暗黙キャッシュは
+            #   セッションを共有しなくても効く。共有すると履歴が伸び、並列呼び出し同士も干渉する）
+            session = await self._session_service.create_session(
+                app_name=APP_NAME,
+                user_id=USER_ID
             )
             
             content = types.Content(
@@ -259,16 +384,20 @@ class MultiAgentSystem:
                 parts=[types.Part(text=query)]
             )
             
+            # 最終応答を受け取った時点でイベントの読み出しを打ち切る
             response_text = ""
-            async for event in runner.run_async(
-                user_id="user1",
+            async with aclosing(runner.run_async(
+                user_id=USER_ID,
                 session_id=session.id,
                 new_message=content
-            ):
-                if event.is_final_response():
-                    response_text = event.content.parts[0].text
+            )) as events:
+                async for event in events:
+                    if event.is_final_response():
+                        response_text = event.content.parts[0].text
+                        break
             
-            execution_time = time.time() - start_time
+            execution_time = elapsed()
+            logger.info("✅ %s completed (%.2fs)", agent_name, execution_time)
             
             result = AgentResult(
                 agent_name=agent_name,
@@ -282,7 +411,8 @@ class MultiAgentSystem:
             return result
             
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = elapsed()
+            logger.error("❌ %s failed (%.2fs): %s", agent_name, execution_time, e)
             result = AgentResult(
                 agent_name=agent_name,
                 input_query=query,
@@ -293,12 +423,28 @@ class MultiAgentSystem:
             )
             self.execution_log.append(result)
             return result
-    
-    async def run_sequential(self, tasks: list[tuple[str, str]]) -> list[AgentResult]:
+        
+        finally:
+            # 共有のセッションサービスにセッションが溜まり続けないよう削除
+            if session is not None:
+                await self._session_service.delete_session(
+                    app_name=APP_NAME,
+                    user_id=USER_ID,
+                    session_id=session.id
+                )
+    
+    async def run_sequential(
+        self,
+        tasks: Union[list[tuple[str, str]], list[WorkflowTask]]
+    ) -> list[AgentResult]:
         """
         Sequential Execution（順次実行）
         タスクを順番に実行し、前のタスクの結果を次に渡す
+        WorkflowTask のリストを渡した場合は依存関係に従って実行する（run_dag）
         """
+        if tasks and isinstance(tasks[0], WorkflowTask):
+            return await self.run_dag(tasks)
+        
         print("\n" + "=" * 60)
         print("🔗 SEQUENTIAL EXECUTION")
         print("=" * 60)
@@ -309,7 +455,7 @@ class MultiAgentSystem:
         for i, (agent_name, query) in enumerate(tasks):
             # 前の出力を現在のクエリに追加
             if previous_output and i > 0:
-                query = f"{query}\n\nPrevious context: {previous_output[:500]}"
+                query = f"{query}\n\nPrevious context: {previous_output[:CONTEXT_CHARS]}"
             
             print(f"\n  Step {i+1}: {agent_name}")
             print(f"  Query: {query[:80]}...")
@@ -326,26 +472,74 @@ class MultiAgentSystem:
         
         return results
     
-    async def run_parallel(self, tasks: list[tuple[str, str]]) -> list[AgentResult]:
+    async def run_dag(self, tasks: list[WorkflowTask]) -> list[AgentResult]:
+        """
+        DAG Execution（依存関係に基づく実行）
+        依存関係のないタスクは同時に実行し、依存先の出力だけを次のタスクに渡す
+        """
+        print("\n" + "=" * 60)
+        print("🕸️ DAG EXECUTION")
+        print("=" * 60)
+        
+        outputs: dict[str, str] = {}
+        results_by_name: dict[str, AgentResult] = {}
+        
+        for phase_no, phase in enumerate(topological_phases(tasks), 1):
+            print(f"\n  Phase {phase_no}: {', '.join(task.name for task in phase)}")
+            
+            phase_results = await asyncio.gather(*(
+                self.run_agent(task.agent_name, resolve_template(task, outputs))
+                for task in phase
+            ))
+            
+            failed = False
+            for task, result in zip(phase, phase_results):
+                results_by_name[task.name] = result
+                if result.success:
+                    outputs[task.name] = result.output
+                    print(f"  ✅ {task.name} ({task.agent_name}) completed in {result.execution_time:.2f}s")
+                else:
+                    failed = True
+                    print(f"  ❌ {task.name} ({task.agent_name}) failed: {result.error}")
+            
+            if failed:
+                break
+        
+        return [results_by_name[task.name] for task in tasks if task.name in results_by_name]
+    
+    async def _run_agent_limited(self, semaphore: asyncio.Semaphore, agent_name: str, query: str) -> AgentResult:
+        """同時実行数の上限内でエージェントを実行"""
+        async with semaphore:
+            return await self.run_agent(agent_name, query)
+    
+    async def run_parallel(
+        self,
+        tasks: list[tuple[str, str]],
+        max_concurrency: Optional[int] = None
+    ) -> list[AgentResult]:
         """
         Parallel Execution（並列実行）
-        複数のタスクを同時に実行
+        複数のタスクを同時に実行（同時実行数は max_concurrency まで）
         """
         print("\n" + "=" * 60)
         print("⚡ PARALLEL EXECUTION")
         print("=" * 60)
         
-        print(f"\n  Running {len(tasks)} tasks in parallel...")
+        if max_concurrency is None:
+            max_concurrency = ProductionConfig.RATE_LIMIT_REQUESTS
+        
+        print(f"\n  Running {len(tasks)} tasks in parallel (max {max_concurrency} at a time)...")
         
         # 並列で実行
+        semaphore = asyncio.Semaphore(max_concurrency)
         coroutines = [
-            self.run_agent(agent_name, query) 
+            self._run_agent_limited(semaphore, agent_name, query)
             for agent_name, query in tasks
         ]
         
-        start_time = time.time()
+        elapsed = _stopwatch()
         results = await asyncio.gather(*coroutines, return_exceptions=True)
-        total_time = time.time() - start_time
+        total_time = elapsed()
         
         # 結果を処理
         processed_results = []
@@ -399,7 +593,8 @@ class ProductionConfig:
     
     # リトライ設定
     MAX_RETRIES = 3
-    RETRY_DELAY = 1.0
+    RETRY_DELAY = 1.0  # バックオフの基準値（1.0s, 2.0s, 4.0s, ...）
+    RETRY_MAX_DELAY = 30.0
     
     # タイムアウト設定
     REQUEST_TIMEOUT = 30.0
@@ -417,12 +612,78 @@ class ProductionConfig:
         print("⚙️ PRODUCTION CONFIGURATION")
         print("=" * 60)
         print(f"  Max Retries: {cls.MAX_RETRIES}")
-        print(f"  Retry Delay: {cls.RETRY_DELAY}s")
+        print(f"  Retry Delay: {cls.RETRY_DELAY}s (exponential backoff, max {cls.RETRY_MAX_DELAY}s)")
         print(f"  Request Timeout: {cls.REQUEST_TIMEOUT}s")
         print(f"  Rate Limit: {cls.RATE_LIMIT_REQUESTS} requests / {cls.RATE_LIMIT_PERIOD}s")
         print(f"  Log Level: {cls.LOG_LEVEL}")
 
 
+class AsyncRateLimiter:
+    """period 秒あたり max_requests 回までにリクエストを制限（スライディングウィンドウ）"""
+    
+    def __init__(self, max_requests: int, period: float):
+        self.max_requests = max_requests
+        self.period = period
+        self._timestamps: deque[float] = deque()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """上限に達している場合は、一番古いリクエストが期間外になるまでだけ待機"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+                
+                if len(self._timestamps) < self.max_requests:
+                    self._timestamps.append(now)
+                    return
+                
+                await asyncio.sleep(self.period - (now - self._timestamps[0]))
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+# 一時的なエラー（先頭の 5xx/429 ステータス、または API のステータス名）。恒久的なエラーより優先
+_TRANSIENT_ERROR_RE = re.compile(
+    r"^\s*(?:5\d\d|429)\b|\b(?:UNAVAILABLE|RESOURCE_EXHAUSTED|DEADLINE_EXCEEDED|INTERNAL)\b"
+)
+
+# リトライしても結果が変わらないエラー（先頭の 400/401/403/404 ステータス、API のステータス名、
+# run_agent が返す未登録エージェントのエラー）。本文中の単語や数字には反応しない
+_PERMANENT_ERROR_RE = re.compile(
+    r"^\s*40[0134]\b"
+    r"|\b(?:INVALID_ARGUMENT|NOT_FOUND|PERMISSION_DENIED|UNAUTHENTICATED|FAILED_PRECONDITION)\b"
+    r"|^Agent '.*' not found$"
+)
+
+# サーバーが返す待機時間（例: 'retryDelay': '37s', Retry-After: 10）
+_RETRY_AFTER_RE = re.compile(r"retry[-_ ]?(?:after|delay)['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def is_retryable_error(error: str) -> bool:
+    """レート制限・タイムアウト・5xx などの一時的なエラーかどうか（恒久的なエラーは False）"""
+    if _TRANSIENT_ERROR_RE.search(error):
+        return True
+    return not _PERMANENT_ERROR_RE.search(error)
+
+
+def retry_delay(attempt: int, error: str = "") -> float:
+    """指数バックオフ + ジッター（サーバーが待機時間を指定していればそれを優先）"""
+    match = _RETRY_AFTER_RE.search(error)
+    if match:
+        return min(float(match.group(1)), ProductionConfig.RETRY_MAX_DELAY)
+    
+    base = ProductionConfig.RETRY_DELAY
+    delay = base * (2 ** attempt) + random.uniform(0, 0.25 * base)
+    return min(delay, ProductionConfig.RETRY_MAX_DELAY)
+
+
 async def run_with_retry(system: MultiAgentSystem, agent_name: str, query: str) -> AgentResult:
     """リトライ機能付きで実行"""
     for attempt in range(ProductionConfig.MAX_RETRIES):
@@ -431,9 +692,14 @@ async def run_with_retry(system: MultiAgentSystem, agent_name: str, query: str)
         if result.success:
             return result
         
+        if not is_retryable_error(result.error):
+            logger.error("❌ %s: not retrying: %s", agent_name, result.error)
+            break
+        
         if attempt < ProductionConfig.MAX_RETRIES - 1:
-            print(f"  ⚠️ Retry {attempt + 1}/{ProductionConfig.MAX_RETRIES}...")
-            await asyncio.sleep(ProductionConfig.RETRY_DELAY)
+            delay = retry_delay(attempt, result.error)
+            logger.warning("⚠️ %s: retry %d/%d in %.1fs", agent_name, attempt + 1, ProductionConfig.MAX_RETRIES, delay)
+            await asyncio.sleep(delay)
     
     return result
 
@@ -469,10 +735,6 @@ async def demo_multi_agent():
         print(f"\n  🤖 Research Agent Response:")
         print(f"  {result.output[:200]}...")
     
-    # 少し待機（レート制限対策）
-    print("\n  ⏳ Waiting to avoid rate limit...")
-    await asyncio.sleep(5)
-    
     # --- デモ 2: 順次実行 ---
     print("\n" + "=" * 60)
     print("📌 Demo 2: Sequential Execution (Research → Analysis)")
@@ -491,10 +753,6 @@ async def demo_multi_agent():
             print(f"\n  📄 {result.agent_name} Output:")
             print(f"  {result.output[:150]}...")
     
-    # 少し待機
-    print("\n  ⏳ Waiting to avoid rate limit...")
-    await asyncio.sleep(5)
-    
     # --- デモ 3: 並列実行 ---
     print("\n" + "=" * 60)
     print("📌 Demo 3: Parallel Execution")